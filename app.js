@@ -1,19 +1,111 @@
+const cluster = require('cluster')
 const express = require('express')
-const app = express()
 
 const mongoose = require('mongoose')
 const bodyParser = require('body-parser')
 require('dotenv/config')
+const expirySweeper = require('./lib/expirySweeper')
+const leaderboard = require('./lib/leaderboard')
+const { startPrimary, workerCount } = require('./lib/cluster')
+const { registry, startMetricsServer } = require('./lib/metrics')
+const { monitorCommands } = require('./lib/dbMonitor')
+const { registerRuntimeMetrics } = require('./lib/runtimeMetrics')
+const { requestMetrics } = require('./middleware/metrics')
+const { requestContext } = require('./lib/requestContext')
+const { createAdmissionControl } = require('./middleware/admission')
+const { compression } = require('./middleware/compression')
+const { attachReadModels } = require('./lib/liveUpdates')
+const changeStream = require('./lib/changeStream')
+const { closeAllStreams } = require('./lib/sse')
+const { flushAuthCache } = require('./middleware/auth')
+const clock = require('./lib/clock')
+const { deliverRelayed, relayPublishes } = require('./lib/events')
 
-app.use(bodyParser.json())
+const PORT = Number.parseInt(process.env.PORT || '3000', 10)
+const SHUTDOWN_TIMEOUT_MS = Number.parseInt(process.env.SHUTDOWN_TIMEOUT_MS || '10000', 10)
+// Prometheus text format on its own port; METRICS_PORT=0 turns it off
+const METRICS_PORT = Number.parseInt(process.env.METRICS_PORT || '9091', 10)
 
-app.use("/api/auth", require("./routes/auth"));
-app.use("/api/posts", require("./routes/post"));
-app.use("/api/topics", require("./routes/topic"));
+function startServer(){
+    const app = express()
 
+    registerRuntimeMetrics()
+    // Without change streams, cluster workers share post changes through the primary
+    if (cluster.isWorker && process.env.CHANGE_STREAMS !== '1') {
+        relayPublishes((event)=>{ if (process.connected) process.send({ type: 'event', event }) })
+    }
+    // Leaderboard, topic caches and ETag versions follow post changes through lib/events
+    attachReadModels()
+    app.use(requestMetrics)
+    // Shed load with 503 + Retry-After before parsing bodies or touching MongoDB
+    app.use(createAdmissionControl())
+    // Lets the slow-query log name the route behind each MongoDB command
+    app.use(requestContext)
+    // gzip/brotli for JSON bodies over COMPRESSION_MIN_BYTES
+    app.use(compression)
 
-mongoose.connect(process.env.DB_CONNECTOR).then(()=>{
-    console.log('Your mongoDB connector is on...')
-})
+    app.use(bodyParser.json())
 
-app.listen(3000);
\ No newline at end of file
+    app.use("/api/auth", require("./routes/auth"));
+    app.use("/api/posts", require("./routes/post"));
+    app.use("/api/topics", require("./routes/topic"));
+    // Operator endpoints; the test clock there needs ENABLE_TEST_CLOCK=1 and ADMIN_KEY
+    app.use("/api/admin", require("./routes/admin"));
+
+
+    mongoose.connect(process.env.DB_CONNECTOR, { monitorCommands: true }).then(()=>{
+        console.log('Your mongoDB connector is on...')
+        monitorCommands(mongoose.connection.getClient())
+        // Flip posts to Expired in the background rather than on the read path
+        expirySweeper.start()
+        // Warm the most-active boards so the first readers do not wait on MongoDB
+        leaderboard.rebuildAll().catch((err)=>console.error('Leaderboard warm-up failed:', err.message))
+        // CHANGE_STREAMS=1 (needs a replica set) shares post changes between all processes
+        if (process.env.CHANGE_STREAMS === '1') changeStream.start()
+    })
+
+    const server = app.listen(PORT)
+
+    // Stop taking new connections, let in-flight requests finish, then exit
+    let closing = false
+    function shutdown(){
+        if (closing) return
+        closing = true
+        expirySweeper.stop()
+        changeStream.stop()
+        setTimeout(()=>process.exit(1), SHUTDOWN_TIMEOUT_MS).unref()
+        server.close(()=>{
+            mongoose.disconnect().finally(()=>process.exit(0))
+        })
+        // SSE clients never hang up on their own; end their streams so close() can finish
+        closeAllStreams()
+        server.closeIdleConnections()
+    }
+
+    process.on('SIGTERM', shutdown)
+    process.on('message', (msg)=>{
+        if (msg && msg.type === 'shutdown') shutdown()
+        // The primary serves /metrics for the whole cluster and asks each worker for its numbers
+        if (msg && msg.type === 'metrics:collect') {
+            process.send({ type: 'metrics:snapshot', id: msg.id, snapshot: registry.snapshot() })
+        }
+        // A post change made on another worker, relayed by the primary
+        if (msg && msg.type === 'event') deliverRelayed(msg.event)
+        // A test-clock move made on another worker, relayed by the primary
+        if (msg && msg.type === 'clock:set') clock.setOffset(msg.offsetMs)
+        // JWT_SECRET was rotated; a flush requested on another worker, relayed by the primary
+        if (msg && msg.type === 'auth:flush') flushAuthCache()
+    })
+
+    if (cluster.isPrimary && METRICS_PORT) {
+        startMetricsServer(METRICS_PORT, ()=>registry.render())
+    }
+}
+
+// CLUSTER_WORKERS=<n>|auto runs one worker per core behind a supervising primary
+const workers = workerCount(process.env.CLUSTER_WORKERS)
+if (cluster.isPrimary && workers > 1){
+    startPrimary({ workers, shutdownTimeoutMs: SHUTDOWN_TIMEOUT_MS, metricsPort: METRICS_PORT })
+} else {
+    startServer()
+}
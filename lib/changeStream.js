@@ -0,0 +1,142 @@
+const Post = require("../models/Post");
+const { EVENT_PROJECTION } = require("./postViews");
+const { deliverRemote, markShared } = require("./events");
+const leaderboard = require("./leaderboard");
+
+// Only inserts and the updates other processes care about; status covers the sweeper
+const WATCHED_FIELDS = ["likesCount", "dislikesCount", "commentsCount", "status"];
+
+const PIPELINE = [
+  {
+    $match: {
+      $or: [
+        { operationType: "insert" },
+        {
+          operationType: "update",
+          $or: WATCHED_FIELDS.map((f) => ({ [`updateDescription.updatedFields.${f}`]: { $exists: true } })),
+        },
+      ],
+    },
+  },
+  {
+    $project: {
+      operationType: 1,
+      "updateDescription.updatedFields": 1,
+      ...Object.fromEntries(["_id", ...Object.keys(EVENT_PROJECTION)].map((f) => [`fullDocument.${f}`, 1])),
+    },
+  },
+];
+
+function eventType(change) {
+  if (change.operationType === "insert") return "post";
+  const fields = change.updateDescription.updatedFields;
+  if (fields.status === "Expired") return "expired";
+  if ("commentsCount" in fields) return "comment";
+  return "vote";
+}
+
+/**
+ * Tails the posts collection with a change stream and turns inserts and counter updates
+ * into lib/events deliveries, so caches, the leaderboard and SSE clients in every process
+ * see changes made by any process. Requires a replica set (a single-node one is enough).
+ *
+ * Changes are buffered for `batchMs` and coalesced to the latest state per post, so a
+ * vote storm on one post costs one delivery per batch, and any number of expiries cost one.
+ * The last resume token is kept, so after a network error the stream carries on exactly
+ * where it stopped. If MongoDB can no longer resume from it, everything derived from
+ * events is invalidated and rebuilt instead.
+ */
+class PostChangeStream {
+  constructor({ batchMs = 50, batchSize = 500 } = {}) {
+    this.batchMs = batchMs;
+    this.batchSize = batchSize;
+    this.stream = null;
+    this.resumeToken = null;
+    this.pending = new Map(); // postId -> latest change
+    this.expired = false;
+    this.flushTimer = null;
+    this.retryMs = 500;
+    this.stopped = false;
+  }
+
+  start() {
+    this.stopped = false;
+    markShared();
+    this.open();
+  }
+
+  stop() {
+    this.stopped = true;
+    clearTimeout(this.flushTimer);
+    if (this.stream) this.stream.close().catch(() => {});
+    this.stream = null;
+  }
+
+  open() {
+    const options = { fullDocument: "updateLookup", batchSize: this.batchSize };
+    if (this.resumeToken) options.resumeAfter = this.resumeToken;
+
+    const stream = Post.watch(PIPELINE, options);
+    this.stream = stream;
+
+    stream.on("change", (change) => {
+      this.retryMs = 500;
+      this.resumeToken = change._id;
+      this.enqueue(change);
+    });
+
+    stream.on("error", (err) => {
+      if (this.stream !== stream) return;
+      this.stream = null;
+      stream.close().catch(() => {});
+
+      // 286 = ChangeStreamHistoryLost, 280 = ChangeStreamFatalError: the token is unusable
+      if (err && (err.code === 286 || err.code === 280)) {
+        this.resumeToken = null;
+        this.resync();
+      }
+      if (this.stopped) return;
+      console.error(`Change stream error (${err.message}); reopening in ${this.retryMs}ms`);
+      setTimeout(() => {
+        if (!this.stopped) this.open();
+      }, this.retryMs).unref();
+      this.retryMs = Math.min(this.retryMs * 2, 30 * 1000);
+    });
+  }
+
+  enqueue(change) {
+    const type = eventType(change);
+    if (type === "expired") {
+      this.expired = true;
+    } else if (change.fullDocument) {
+      // updateLookup returns the current document, so the latest change per post is enough
+      this.pending.set(String(change.fullDocument._id), { type, post: change.fullDocument });
+    }
+
+    if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flush(), this.batchMs);
+    }
+  }
+
+  flush() {
+    this.flushTimer = null;
+    const events = [...this.pending.values()];
+    this.pending.clear();
+    if (this.expired) {
+      this.expired = false;
+      events.push({ type: "expired" });
+    }
+    for (const event of events) {
+      deliverRemote(event);
+    }
+  }
+
+  // We may have missed changes: drop everything derived from them
+  resync() {
+    leaderboard.clear();
+    deliverRemote({ type: "expired" });
+  }
+}
+
+module.exports = new PostChangeStream();
+module.exports.PostChangeStream = PostChangeStream;
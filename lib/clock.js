@@ -0,0 +1,43 @@
+const { EventEmitter } = require("events");
+
+/**
+ * The time expiry decisions are made against: post status, the vote and comment filters
+ * and the expiry sweeper all read it instead of Date.now().
+ *
+ * Normally it is the wall clock. With ENABLE_TEST_CLOCK=1 the admin clock endpoint can
+ * shift it forward, so tests can expire a post without waiting for it. Moving it back does
+ * not revive posts the sweeper has already marked Expired.
+ *
+ * Emits "change" with the new offset whenever it moves.
+ */
+class Clock extends EventEmitter {
+  constructor() {
+    super();
+    this.offsetMs = 0;
+  }
+
+  now() {
+    return Date.now() + this.offsetMs;
+  }
+
+  date() {
+    return new Date(this.now());
+  }
+
+  setOffset(offsetMs) {
+    if (!Number.isFinite(offsetMs) || offsetMs === this.offsetMs) return;
+    this.offsetMs = offsetMs;
+    this.emit("change", offsetMs);
+  }
+
+  advance(ms) {
+    this.setOffset(this.offsetMs + ms);
+  }
+
+  reset() {
+    this.setOffset(0);
+  }
+}
+
+module.exports = new Clock();
+module.exports.Clock = Clock;
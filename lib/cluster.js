@@ -0,0 +1,156 @@
+const cluster = require("cluster");
+const os = require("os");
+const { mergeSnapshots, renderSnapshot, startMetricsServer } = require("./metrics");
+
+// CLUSTER_WORKERS=auto uses every core; anything below 2 means no cluster at all
+function workerCount(value) {
+  if (String(value || "").toLowerCase() === "auto") {
+    return os.availableParallelism();
+  }
+  const n = Number.parseInt(value || "1", 10);
+  return Number.isFinite(n) && n > 0 ? n : 1;
+}
+
+// Worker messages the primary passes on to every other worker
+const BROADCAST_TYPES = new Set(["event", "clock:set", "auth:flush"]);
+
+// Ask every live worker for its metrics snapshot; a worker that does not answer in time is skipped
+let metricsRequestId = 0;
+
+function collectWorkerMetrics(timeoutMs = 1000) {
+  const workers = Object.values(cluster.workers).filter((w) => w.isConnected());
+  return Promise.all(
+    workers.map(
+      (worker) =>
+        new Promise((resolve) => {
+          const id = (metricsRequestId += 1);
+          const finish = (result) => {
+            clearTimeout(timer);
+            worker.off("message", onMessage);
+            resolve(result);
+          };
+          const timer = setTimeout(() => finish(null), timeoutMs);
+          function onMessage(msg) {
+            if (msg && msg.type === "metrics:snapshot" && msg.id === id) {
+              finish({ worker: worker.id, snapshot: msg.snapshot });
+            }
+          }
+          worker.on("message", onMessage);
+          worker.send({ type: "metrics:collect", id });
+        })
+    )
+  ).then((results) => results.filter(Boolean));
+}
+
+/**
+ * Primary process for multi-core mode. It only supervises; the workers run app.js.
+ *
+ * - Crashed workers are respawned, with a growing delay if they keep dying at boot.
+ * - SIGHUP rolls a restart: each worker is replaced one at a time, and the old one is
+ *   only told to drain once its replacement is listening, so capacity never drops by more
+ *   than one worker. If a replacement dies before listening (a bad deploy), the roll stops
+ *   and the remaining old workers keep serving.
+ * - SIGTERM/SIGINT drain every worker and exit.
+ * - With a metricsPort, /metrics there shows every worker's metrics combined.
+ * - Post events (when change streams are off), test-clock moves and auth-cache flushes from
+ *   one worker are relayed to the others; workers started later also get the current clock.
+ */
+function startPrimary({ workers, shutdownTimeoutMs = 10 * 1000, metricsPort = 0 }) {
+  let stopping = false;
+  let rolling = false;
+  let crashStreak = 0;
+  let clockOffsetMs = 0;
+
+  function fork() {
+    const worker = cluster.fork();
+    worker.startedAt = Date.now();
+    if (clockOffsetMs) {
+      worker.once("listening", () => worker.send({ type: "clock:set", offsetMs: clockOffsetMs }));
+    }
+    return worker;
+  }
+
+  // Ask a worker to finish in-flight requests and exit; kill it if it takes too long
+  function retire(worker) {
+    return new Promise((resolve) => {
+      if (worker.isDead()) return resolve();
+      const timer = setTimeout(() => worker.process.kill("SIGKILL"), shutdownTimeoutMs);
+      worker.once("exit", () => {
+        clearTimeout(timer);
+        resolve();
+      });
+      worker.retiring = true;
+      worker.send({ type: "shutdown" });
+    });
+  }
+
+  async function rollingRestart() {
+    if (rolling || stopping) return;
+    rolling = true;
+    console.log(`Rolling restart of ${Object.keys(cluster.workers).length} workers...`);
+    for (const worker of Object.values(cluster.workers)) {
+      if (stopping) break;
+      const replacement = fork();
+      // Not respawned if it dies while we wait; the roll just stops
+      replacement.probation = true;
+      const listening = await new Promise((resolve) => {
+        replacement.once("listening", () => resolve(true));
+        replacement.once("exit", () => resolve(false));
+      });
+      replacement.probation = false;
+      if (!listening) {
+        console.error(`Replacement worker exited before listening; keeping ${worker.process.pid} and stopping the roll`);
+        rolling = false;
+        return;
+      }
+      await retire(worker);
+    }
+    rolling = false;
+    console.log("Rolling restart complete");
+  }
+
+  async function shutdown() {
+    if (stopping) return;
+    stopping = true;
+    await Promise.all(Object.values(cluster.workers).map(retire));
+    process.exit(0);
+  }
+
+  cluster.on("exit", (worker, code, signal) => {
+    if (stopping || worker.retiring || worker.probation) return;
+    // Back off when workers die straight after boot (bad config, DB down, ...)
+    crashStreak = Date.now() - worker.startedAt < 5000 ? crashStreak + 1 : 0;
+    const delay = Math.min(100 * 2 ** crashStreak, 10 * 1000);
+    console.error(`Worker ${worker.process.pid} died (${signal || code}); respawning in ${delay}ms`);
+    setTimeout(() => {
+      if (!stopping) fork();
+    }, delay);
+  });
+
+  cluster.on("message", (from, msg) => {
+    if (!msg || !BROADCAST_TYPES.has(msg.type)) return;
+    if (msg.type === "clock:set") {
+      clockOffsetMs = msg.offsetMs;
+    }
+    for (const worker of Object.values(cluster.workers)) {
+      if (worker !== from && worker.isConnected()) {
+        worker.send(msg);
+      }
+    }
+  });
+
+  process.on("SIGHUP", rollingRestart);
+  process.on("SIGTERM", shutdown);
+  process.on("SIGINT", shutdown);
+
+  if (metricsPort) {
+    startMetricsServer(metricsPort, async () => renderSnapshot(mergeSnapshots(await collectWorkerMetrics())));
+  }
+
+  console.log(`Primary ${process.pid} starting ${workers} workers`);
+  for (let i = 0; i < workers; i += 1) {
+    fork();
+  }
+}
+
+module.exports = { startPrimary, workerCount };
@@ -0,0 +1,60 @@
+const mongoose = require("mongoose");
+
+// Opaque pagination cursors: clients get a URL-safe token and hand it back unchanged
+
+function encodeCursor(value) {
+  return Buffer.from(JSON.stringify(value), "utf8").toString("base64url");
+}
+
+// Returns null for anything that is not a cursor we issued
+function decodeCursor(token) {
+  if (typeof token !== "string" || token.length === 0 || token.length > 512) {
+    return null;
+  }
+  try {
+    const value = JSON.parse(Buffer.from(token, "base64url").toString("utf8"));
+    return value && typeof value === "object" ? value : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Keyset cursors for lists sorted by { <dateField>: -1, _id: -1 }.
+ * The cursor remembers the last row's (date, _id), so the next page is an index seek
+ * rather than a skip, and rows inserted meanwhile cannot shift the page boundaries.
+ */
+function decodeKeysetCursor(token) {
+  const value = decodeCursor(token);
+  if (!value || typeof value.v !== "string" || !mongoose.isValidObjectId(value.id)) {
+    return null;
+  }
+  const date = new Date(value.v);
+  if (Number.isNaN(date.getTime())) {
+    return null;
+  }
+  return { value: date, id: new mongoose.Types.ObjectId(value.id) };
+}
+
+function keysetFilter(field, key) {
+  return {
+    $or: [{ [field]: { $lt: key.value } }, { [field]: key.value, _id: { $lt: key.id } }],
+  };
+}
+
+// A short page means we reached the end
+function nextKeysetCursor(items, field, limit) {
+  if (items.length === 0 || items.length < limit) {
+    return null;
+  }
+  const last = items[items.length - 1];
+  return encodeCursor({ v: new Date(last[field]).toISOString(), id: String(last._id) });
+}
+
+module.exports = {
+  encodeCursor,
+  decodeCursor,
+  decodeKeysetCursor,
+  keysetFilter,
+  nextKeysetCursor,
+};
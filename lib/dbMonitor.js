@@ -0,0 +1,172 @@
+const { registry } = require("./metrics");
+const { currentRequest } = require("./requestContext");
+const { routeLabel } = require("../middleware/metrics");
+
+const commandLatency = registry.histogram(
+  "mingle_mongodb_command_duration_seconds",
+  "MongoDB command latency by command and collection"
+);
+const commandFailures = registry.counter(
+  "mingle_mongodb_command_failures_total",
+  "Failed MongoDB commands by command and collection"
+);
+const slowCommands = registry.counter(
+  "mingle_mongodb_slow_commands_total",
+  "MongoDB commands slower than SLOW_QUERY_MS by command and collection"
+);
+
+// Commands the driver runs for itself; they would only add noise
+const IGNORED = new Set(["hello", "isMaster", "ismaster", "ping", "endSessions", "saslStart", "saslContinue"]);
+
+// A change stream opens with an aggregate whose first stage is $changeStream
+function isChangeStream(command) {
+  const first = Array.isArray(command.pipeline) ? command.pipeline[0] : null;
+  return command.aggregate !== undefined && Boolean(first && first.$changeStream);
+}
+
+// Driver/session fields that are not part of the query and must not be sent back to explain
+const SESSION_FIELDS = new Set(["lsid", "$db", "$clusterTime", "txnNumber", "$readPreference", "readConcern", "writeConcern"]);
+
+// Pull the filter and sort out of the command shapes Mongoose issues
+function describeCommand(name, command) {
+  switch (name) {
+    case "find":
+      return { filter: command.filter, sort: command.sort };
+    case "findAndModify":
+    case "count":
+      return { filter: command.query, sort: command.sort };
+    case "update":
+      return { filter: command.updates && command.updates[0] && command.updates[0].q };
+    case "delete":
+      return { filter: command.deletes && command.deletes[0] && command.deletes[0].q };
+    case "aggregate":
+      return { filter: command.pipeline };
+    default:
+      return {};
+  }
+}
+
+// Replace literal values with their type, so logs carry no user data and equal shapes compare equal
+function redact(value) {
+  if (value === null || value === undefined) return value;
+  if (Array.isArray(value)) return value.map(redact);
+  if (value instanceof Date) return "<date>";
+  if (typeof value === "object") {
+    if (value._bsontype) return `<${value._bsontype}>`;
+    const out = {};
+    for (const [k, v] of Object.entries(value)) out[k] = redact(v);
+    return out;
+  }
+  return `<${typeof value}>`;
+}
+
+// Index names (or COLLSCAN) anywhere in a winning plan, whatever the server's plan format
+function plannedIndexes(plan, found = new Set()) {
+  if (!plan || typeof plan !== "object") return found;
+  if (plan.stage === "COLLSCAN") found.add("COLLSCAN");
+  if (plan.indexName) found.add(plan.indexName);
+  for (const value of Object.values(plan)) {
+    if (value && typeof value === "object") plannedIndexes(value, found);
+  }
+  return found;
+}
+
+/**
+ * Time every command through the driver's command monitoring events, and log any command
+ * slower than SLOW_QUERY_MS (default 200, 0 turns the log off) with the route that issued it
+ * and its redacted filter and sort. With SLOW_QUERY_EXPLAIN=1 the first slow command of each
+ * query shape is also re-run as explain('executionStats') to report docs examined and the
+ * index used. Explaining a write does not perform it.
+ * getMores on change-stream cursors (lib/changeStream.js) are not counted: they wait on the
+ * server for new changes by design, so every one would look slow.
+ * The client must be created with monitorCommands: true.
+ */
+function monitorCommands(client) {
+  const slowMs = Number.parseInt(process.env.SLOW_QUERY_MS || "200", 10);
+  const explainSlow = process.env.SLOW_QUERY_EXPLAIN === "1";
+  const explainedShapes = new Set();
+  const started = new Map(); // requestId -> details of the command in flight
+  const awaitCursors = new Set(); // ids of open change-stream cursors
+
+  async function explain(info) {
+    const command = {};
+    for (const [k, v] of Object.entries(info.raw)) {
+      if (!SESSION_FIELDS.has(k)) command[k] = v;
+    }
+    const result = await client.db(info.database).command({ explain: command, verbosity: "executionStats" });
+    const stats = result.executionStats || {};
+    return {
+      docsExamined: stats.totalDocsExamined,
+      keysExamined: stats.totalKeysExamined,
+      returned: stats.nReturned,
+      indexes: [...plannedIndexes(result.queryPlanner && result.queryPlanner.winningPlan)],
+    };
+  }
+
+  async function logSlow(info, durationMs) {
+    const { filter, sort } = describeCommand(info.command, info.raw);
+    const entry = {
+      msg: "slow mongodb command",
+      ms: durationMs,
+      route: info.route,
+      command: info.command,
+      collection: info.collection,
+      filter: redact(filter),
+      sort,
+    };
+
+    const shape = JSON.stringify([info.collection, info.command, entry.filter, sort]);
+    if (explainSlow && !explainedShapes.has(shape)) {
+      explainedShapes.add(shape);
+      try {
+        entry.explain = await explain(info);
+      } catch (err) {
+        entry.explainError = err.message;
+      }
+    }
+    console.warn(JSON.stringify(entry));
+  }
+
+  client.on("commandStarted", (event) => {
+    if (IGNORED.has(event.commandName)) return;
+    if (event.commandName === "getMore" && awaitCursors.has(String(event.command.getMore))) return;
+    if (event.commandName === "killCursors") {
+      for (const id of event.command.cursors || []) awaitCursors.delete(String(id));
+    }
+    const target = event.command[event.commandName];
+    const req = currentRequest();
+    started.set(event.requestId, {
+      command: event.commandName,
+      collection: typeof target === "string" ? target : "",
+      database: event.databaseName,
+      raw: event.command,
+      route: req ? `${req.method} ${routeLabel(req)}` : "background",
+    });
+  });
+
+  function finish(event, failed) {
+    const info = started.get(event.requestId);
+    if (!info) return;
+    started.delete(event.requestId);
+
+    const labels = { command: info.command, collection: info.collection };
+    commandLatency.observe(labels, event.duration / 1000);
+    if (failed) commandFailures.inc(labels);
+
+    if (slowMs > 0 && event.duration >= slowMs && info.command !== "explain") {
+      slowCommands.inc(labels);
+      logSlow(info, event.duration);
+    }
+  }
+
+  client.on("commandSucceeded", (event) => {
+    const info = started.get(event.requestId);
+    if (info && isChangeStream(info.raw) && event.reply && event.reply.cursor) {
+      awaitCursors.add(String(event.reply.cursor.id));
+    }
+    finish(event, false);
+  });
+  client.on("commandFailed", (event) => finish(event, true));
+}
+
+module.exports = { monitorCommands };
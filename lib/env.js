@@ -0,0 +1,7 @@
+// Integer settings from the environment; anything missing, malformed or below `min` falls back
+function envInt(name, fallback, min = 1) {
+  const n = Number.parseInt(process.env[name] || "", 10);
+  return Number.isFinite(n) && n >= min ? n : fallback;
+}
+
+module.exports = { envInt };
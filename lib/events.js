@@ -0,0 +1,116 @@
+const cluster = require("cluster");
+const { EventEmitter } = require("events");
+const LRUCache = require("./lru");
+
+/**
+ * Pub/sub for post changes. routes/post.js and the expiry sweeper publish;
+ * caches, the leaderboard and SSE streams subscribe.
+ *
+ * Event shapes:
+ *   { type: "post" | "vote" | "comment", post }  post is an EVENT_PROJECTION lean document
+ *   { type: "expired" }                           the sweeper expired one or more posts
+ *
+ * Local publishes are delivered straight away. When the MongoDB change-stream consumer
+ * is running (lib/changeStream.js), every process also receives every other process's
+ * changes through deliverRemote; a change this process already published is recognised by
+ * its updatedAt and counts, and not delivered twice. Cluster workers without change streams forward their
+ * own publishes through the primary instead (relayPublishes), and receive the other
+ * workers' through deliverRelayed.
+ */
+const emitter = new EventEmitter();
+// One listener per open SSE connection, so there is no sensible cap
+emitter.setMaxListeners(0);
+
+// Recently published post states by post id, so their change-stream echo can be dropped.
+// The stream coalesces and may skip straight to a newer state, so states not echoed
+// within ECHO_TTL_MS are forgotten.
+const recentlyPublished = new LRUCache(10000); // postId -> [{ key, updatedAt, at }]
+const ECHO_TTL_MS = 10 * 1000;
+
+// Only the change-stream consumer produces echoes
+let expectEchoes = false;
+
+function stateOf(post) {
+  const updatedAt = new Date(post.updatedAt).getTime();
+  return { updatedAt, key: `${updatedAt}:${post.likesCount}:${post.dislikesCount}:${post.commentsCount}` };
+}
+
+function rememberPublished(post) {
+  const id = String(post._id);
+  const now = Date.now();
+  const states = (recentlyPublished.get(id) || []).filter((s) => now - s.at < ECHO_TTL_MS);
+  states.push({ ...stateOf(post), at: now });
+  recentlyPublished.set(id, states);
+}
+
+// True if `post` is the echo of a state published here. Either way, states no newer than
+// it will never be echoed now, so they are forgotten.
+function consumeEcho(post) {
+  const id = String(post._id);
+  const states = recentlyPublished.get(id);
+  if (!states) return false;
+  const { key, updatedAt } = stateOf(post);
+  const echo = states.some((s) => s.key === key);
+  const now = Date.now();
+  const rest = states.filter((s) => s.updatedAt > updatedAt && now - s.at < ECHO_TTL_MS);
+  if (rest.length > 0) {
+    recentlyPublished.set(id, rest);
+  } else {
+    recentlyPublished.delete(id);
+  }
+  return echo;
+}
+
+// Forwards this process's own publishes to the other processes, when set
+let relay = null;
+
+// Whether this process hears about changes made by the others. A lone process has no
+// others; separate instances behind a load balancer need CHANGE_STREAMS=1.
+let shared = !cluster.isWorker;
+
+function publish(event) {
+  if (event.post && expectEchoes) {
+    rememberPublished(event.post);
+  }
+  emitter.emit("change", event);
+  if (relay) {
+    relay(event);
+  }
+}
+
+function relayPublishes(send) {
+  relay = send;
+  shared = true;
+}
+
+// Called when the change-stream consumer starts
+function markShared() {
+  shared = true;
+  expectEchoes = true;
+}
+
+function sharesChanges() {
+  return shared;
+}
+
+// Changes observed in MongoDB, which may have come from this process or any other
+function deliverRemote(event) {
+  if (event.post && consumeEcho(event.post)) {
+    return;
+  }
+  emitter.emit("change", event);
+}
+
+// Another worker's publish, passed on by the cluster primary. The primary never sends a
+// worker its own events back, so there is no echo to drop.
+function deliverRelayed(event) {
+  emitter.emit("change", event);
+}
+
+// Returns a function that removes the listener again
+function subscribe(listener) {
+  emitter.on("change", listener);
+  return () => emitter.off("change", listener);
+}
+
+module.exports = { publish, deliverRemote, deliverRelayed, relayPublishes, markShared, sharesChanges, subscribe };
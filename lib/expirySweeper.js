@@ -0,0 +1,136 @@
+const Post = require("../models/Post");
+const MinHeap = require("./minHeap");
+const { publish } = require("./events");
+const clock = require("./clock");
+
+// setTimeout cannot wait longer than this (about 24.8 days)
+const MAX_TIMER_MS = 2 ** 31 - 1;
+
+/**
+ * Flips Live posts to Expired in the background.
+ *
+ * Upcoming expiry times sit in a min-heap and a single timer is armed for the earliest one.
+ * When it fires, one updateMany expires every post that is due, so readers never pay for
+ * status writes and queries on the stored status (expired history, ?status=) stay correct.
+ * The heap is seeded from MongoDB on start and whenever it runs dry; a slow fallback tick
+ * also picks up posts created by other processes.
+ * Time comes from lib/clock.js; when the test clock jumps, the sweeper sweeps straight away.
+ */
+class ExpirySweeper {
+  constructor({ seedSize = 1000, fallbackMs = 30 * 1000 } = {}) {
+    this.seedSize = seedSize;
+    this.fallbackMs = fallbackMs;
+    this.heap = new MinHeap();
+    this.timer = null;
+    this.timerAt = Infinity;
+    this.fallback = null;
+    this.running = null;
+    this.rerun = false;
+    this.onClockChange = () => this.clockChanged();
+  }
+
+  async start() {
+    this.fallback = setInterval(() => this.sweep(), this.fallbackMs);
+    this.fallback.unref();
+    clock.on("change", this.onClockChange);
+    await this.sweep();
+  }
+
+  stop() {
+    clock.off("change", this.onClockChange);
+    clearInterval(this.fallback);
+    clearTimeout(this.timer);
+    this.fallback = null;
+    this.timer = null;
+    this.timerAt = Infinity;
+  }
+
+  // Called when a post is created so its expiry is swept on time
+  schedule(expiresAt) {
+    const at = new Date(expiresAt).getTime();
+    if (Number.isNaN(at)) return;
+    this.heap.push(at);
+    if (at < this.timerAt) {
+      this.arm();
+    }
+  }
+
+  // Another process may already have expired the posts, so refresh the read models regardless
+  async clockChanged() {
+    await this.sweep();
+    publish({ type: "expired" });
+  }
+
+  arm() {
+    clearTimeout(this.timer);
+    this.timer = null;
+    this.timerAt = Infinity;
+
+    const next = this.heap.peek();
+    if (next === undefined || !this.fallback) return;
+
+    const delay = Math.min(Math.max(next - clock.now(), 0), MAX_TIMER_MS);
+    this.timerAt = next;
+    this.timer = setTimeout(() => this.sweep(), delay);
+    this.timer.unref();
+  }
+
+  async seed() {
+    const upcoming = await Post.find({ status: "Live" })
+      .sort({ expiresAt: 1 })
+      .limit(this.seedSize)
+      .select({ expiresAt: 1, _id: 0 })
+      .lean();
+    for (const post of upcoming) {
+      this.heap.push(new Date(post.expiresAt).getTime());
+    }
+  }
+
+  // Never runs twice at once; a request made mid-sweep runs straight after it
+  async sweep() {
+    if (this.running) {
+      this.rerun = true;
+      return this.running;
+    }
+    this.running = this.runSweep();
+    try {
+      return await this.running;
+    } finally {
+      this.running = null;
+      if (this.rerun) {
+        this.rerun = false;
+        this.sweep();
+      }
+    }
+  }
+
+  async runSweep() {
+    const now = clock.now();
+    let modified = 0;
+    try {
+      const result = await Post.updateMany(
+        { status: "Live", expiresAt: { $lte: new Date(now) } },
+        { $set: { status: "Expired" } }
+      );
+      modified = result.modifiedCount;
+      if (modified > 0) {
+        // Expired history for any topic may have gained posts
+        publish({ type: "expired" });
+      }
+
+      while (this.heap.size > 0 && this.heap.peek() <= now) {
+        this.heap.pop();
+      }
+      if (this.heap.size === 0) {
+        await this.seed();
+      }
+    } catch (err) {
+      console.error("Expiry sweep failed:", err.message);
+    }
+    this.arm();
+    return modified;
+  }
+}
+
+module.exports = new ExpirySweeper();
+module.exports.ExpirySweeper = ExpirySweeper;
@@ -0,0 +1,138 @@
+const Post = require("../models/Post");
+const { EVENT_PROJECTION, computeStatus } = require("./postViews");
+
+const TOPICS = ["Politics", "Health", "Sport", "Tech"];
+
+// Posts tracked per topic; more than we ever serve so small reshuffles never need MongoDB
+const CAPACITY = 50;
+
+// Largest ?k= the most-active endpoint will answer
+const MAX_K = 10;
+
+// Most active first: likes, then dislikes, then newest (same order as the original query)
+function compare(a, b) {
+  return (
+    b.likesCount - a.likesCount ||
+    b.dislikesCount - a.dislikesCount ||
+    new Date(b.createdAt).getTime() - new Date(a.createdAt).getTime() ||
+    String(b._id).localeCompare(String(a._id))
+  );
+}
+
+/**
+ * In-memory top-K "most active" posts per topic (Action 5).
+ *
+ * Each board holds the CAPACITY best posts of its topic with every field the full post
+ * response needs (EVENT_PROJECTION). Votes, comments and new posts are applied in place,
+ * so reads never touch MongoDB. If the board is full and
+ * a tracked post drops to the bottom, an untracked post could now outrank it, so the board
+ * is marked stale and rebuilt from MongoDB on its next read.
+ * Entries keep the status they had when they were placed, so it is recomputed on every read.
+ */
+class Leaderboard {
+  constructor({ capacity = CAPACITY } = {}) {
+    this.capacity = capacity;
+    this.boards = new Map(); // topic -> { entries, stale }
+    this.rebuilding = new Map(); // topic -> Promise, so concurrent readers share one query
+    this.pending = new Map(); // topic -> updates that arrived while its rebuild was in flight
+  }
+
+  async rebuild(topic) {
+    if (this.rebuilding.has(topic)) {
+      return this.rebuilding.get(topic);
+    }
+    this.pending.set(topic, []);
+    const task = Post.find({ topics: topic })
+      .sort({ likesCount: -1, dislikesCount: -1, createdAt: -1, _id: -1 })
+      .limit(this.capacity)
+      .select(EVENT_PROJECTION)
+      .lean()
+      .then((posts) => {
+        const board = { entries: posts, stale: false };
+        // The query may have run before these updates landed; replaying them is idempotent
+        for (const entry of this.pending.get(topic) || []) {
+          this.place(board, entry);
+        }
+        this.boards.set(topic, board);
+        return board;
+      })
+      .finally(() => {
+        this.rebuilding.delete(topic);
+        this.pending.delete(topic);
+      });
+    this.rebuilding.set(topic, task);
+    return task;
+  }
+
+  async rebuildAll() {
+    await Promise.all(TOPICS.map((topic) => this.rebuild(topic)));
+  }
+
+  // Copies of the top k posts for a topic, rebuilding the board first if it is missing or stale
+  async top(topic, k = 1) {
+    let board = this.boards.get(topic);
+    if (!board || board.stale) {
+      board = await this.rebuild(topic);
+    }
+    return board.entries.slice(0, Math.min(k, MAX_K)).map((entry) => ({
+      ...entry,
+      status: computeStatus(entry.expiresAt),
+    }));
+  }
+
+  /**
+   * Apply a post's latest state (an EVENT_PROJECTION lean document) to every topic it is in.
+   * Safe to call for any post: ones that do not make a board are ignored.
+   */
+  update(post) {
+    const entry = { _id: post._id };
+    for (const field of Object.keys(EVENT_PROJECTION)) {
+      if (post[field] !== undefined) entry[field] = post[field];
+    }
+    for (const topic of entry.topics || []) {
+      if (this.pending.has(topic)) {
+        this.pending.get(topic).push(entry);
+        continue;
+      }
+      const board = this.boards.get(topic);
+      if (!board || board.stale) continue;
+      this.place(board, entry);
+    }
+  }
+
+  place(board, entry) {
+    const entries = board.entries;
+    const id = String(entry._id);
+    const index = entries.findIndex((e) => String(e._id) === id);
+    const full = entries.length >= this.capacity;
+
+    if (index === -1) {
+      // An untracked post only gets in if there is room or it beats the current last place
+      if (full && compare(entry, entries[entries.length - 1]) >= 0) return;
+      entries.push(entry);
+    } else {
+      const dropped = compare(entry, entries[index]) > 0;
+      entries[index] = entry;
+      if (dropped && full) {
+        entries.sort(compare);
+        if (String(entries[entries.length - 1]._id) === id) {
+          board.stale = true;
+        }
+        return;
+      }
+    }
+
+    entries.sort(compare);
+    if (entries.length > this.capacity) {
+      entries.length = this.capacity;
+    }
+  }
+
+  clear() {
+    this.boards.clear();
+  }
+}
+
+module.exports = new Leaderboard();
+module.exports.Leaderboard = Leaderboard;
+module.exports.MAX_K = MAX_K;
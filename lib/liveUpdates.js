@@ -0,0 +1,29 @@
+const { subscribe } = require("./events");
+const leaderboard = require("./leaderboard");
+const { topicCache } = require("./responseCache");
+const topicVersions = require("./topicVersions");
+
+/**
+ * Keep the in-memory read models in step with post changes: the most-active leaderboard,
+ * the topic response cache and the per-topic ETag versions.
+ * Live posts only ever change the most-active answer; expired history changes when the
+ * sweeper runs.
+ */
+function attachReadModels() {
+  return subscribe((event) => {
+    if (event.type === "expired") {
+      topicCache.invalidateAll();
+      topicVersions.bumpAll();
+      return;
+    }
+
+    const { post } = event;
+    leaderboard.update(post);
+    for (const topic of post.topics || []) {
+      topicCache.invalidate(topic, "most-active");
+    }
+    topicVersions.bump(post.topics);
+  });
+}
+
+module.exports = { attachReadModels };
@@ -0,0 +1,49 @@
+// Least-recently-used cache on top of Map's insertion order
+class LRUCache {
+  constructor(maxSize) {
+    this.maxSize = maxSize;
+    this.map = new Map();
+    this.evictions = 0;
+  }
+
+  get size() {
+    return this.map.size;
+  }
+
+  get(key) {
+    const value = this.map.get(key);
+    if (value === undefined) return undefined;
+    // Move to the most-recently-used end
+    this.map.delete(key);
+    this.map.set(key, value);
+    return value;
+  }
+
+  has(key) {
+    return this.map.has(key);
+  }
+
+  set(key, value) {
+    this.map.delete(key);
+    this.map.set(key, value);
+    if (this.map.size > this.maxSize) {
+      this.map.delete(this.map.keys().next().value);
+      this.evictions += 1;
+    }
+  }
+
+  delete(key) {
+    return this.map.delete(key);
+  }
+
+  clear() {
+    this.map.clear();
+  }
+
+  // Iterate [key, value] pairs from least to most recently used
+  entries() {
+    return this.map.entries();
+  }
+}
+
+module.exports = LRUCache;
@@ -0,0 +1,242 @@
+const http = require("http");
+
+/**
+ * Minimal Prometheus registry: counters, gauges and histograms with labels, rendered in
+ * the text exposition format. Metrics can also be snapshotted as plain JSON, which is how
+ * cluster workers hand their numbers to the primary for one combined /metrics page.
+ */
+
+const DEFAULT_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+
+function labelKey(labels) {
+  return JSON.stringify(labels || {});
+}
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, "\\\\").replace(/"/g, '\\"').replace(/\n/g, "\\n");
+}
+
+function formatLabels(labels) {
+  const parts = Object.entries(labels).map(([k, v]) => `${k}="${escapeLabel(v)}"`);
+  return parts.length > 0 ? `{${parts.join(",")}}` : "";
+}
+
+class Metric {
+  constructor(type, name, help, { collect } = {}) {
+    this.type = type;
+    this.name = name;
+    this.help = help;
+    this.collect = collect; // optional: refreshes values right before a scrape
+    this.values = new Map(); // labelKey -> { labels, value }
+  }
+
+  slot(labels, init) {
+    const key = labelKey(labels);
+    let entry = this.values.get(key);
+    if (!entry) {
+      entry = { labels: labels || {}, value: init() };
+      this.values.set(key, entry);
+    }
+    return entry;
+  }
+
+  snapshot() {
+    return {
+      type: this.type,
+      name: this.name,
+      help: this.help,
+      buckets: this.buckets,
+      values: [...this.values.values()].map(({ labels, value }) => ({ labels, value })),
+    };
+  }
+}
+
+class Counter extends Metric {
+  constructor(name, help, options) {
+    super("counter", name, help, options);
+  }
+
+  inc(labels, amount = 1) {
+    this.slot(labels, () => 0).value += amount;
+  }
+
+  // For counters mirrored from a component that keeps its own running total
+  set(labels, value) {
+    this.slot(labels, () => 0).value = value;
+  }
+}
+
+class Gauge extends Metric {
+  constructor(name, help, options) {
+    super("gauge", name, help, options);
+  }
+
+  set(labels, value) {
+    this.slot(labels, () => 0).value = value;
+  }
+}
+
+class Histogram extends Metric {
+  constructor(name, help, { buckets = DEFAULT_BUCKETS, ...options } = {}) {
+    super("histogram", name, help, options);
+    this.buckets = buckets;
+  }
+
+  observe(labels, seconds) {
+    const entry = this.slot(labels, () => ({ counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 }));
+    const h = entry.value;
+    for (let i = 0; i < this.buckets.length; i += 1) {
+      if (seconds <= this.buckets[i]) {
+        h.counts[i] += 1;
+        break;
+      }
+    }
+    h.sum += seconds;
+    h.count += 1;
+  }
+
+  // Start a timer; calling the returned function records the elapsed time
+  startTimer(labels) {
+    const start = process.hrtime.bigint();
+    return (extraLabels) => {
+      const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+      this.observe({ ...labels, ...extraLabels }, seconds);
+      return seconds;
+    };
+  }
+}
+
+class Registry {
+  constructor() {
+    this.metrics = new Map();
+  }
+
+  register(metric) {
+    this.metrics.set(metric.name, metric);
+    return metric;
+  }
+
+  counter(name, help, options) {
+    return this.metrics.get(name) || this.register(new Counter(name, help, options));
+  }
+
+  gauge(name, help, options) {
+    return this.metrics.get(name) || this.register(new Gauge(name, help, options));
+  }
+
+  histogram(name, help, options) {
+    return this.metrics.get(name) || this.register(new Histogram(name, help, options));
+  }
+
+  snapshot() {
+    const out = [];
+    for (const metric of this.metrics.values()) {
+      if (metric.collect) {
+        try {
+          metric.collect(metric);
+        } catch {
+          // A broken collector must not take the whole scrape down
+        }
+      }
+      out.push(metric.snapshot());
+    }
+    return out;
+  }
+
+  render() {
+    return renderSnapshot(this.snapshot());
+  }
+}
+
+function renderSnapshot(snapshot) {
+  const lines = [];
+  for (const metric of snapshot) {
+    lines.push(`# HELP ${metric.name} ${metric.help}`);
+    lines.push(`# TYPE ${metric.name} ${metric.type}`);
+    for (const { labels, value } of metric.values) {
+      if (metric.type !== "histogram") {
+        lines.push(`${metric.name}${formatLabels(labels)} ${value}`);
+        continue;
+      }
+      let cumulative = 0;
+      metric.buckets.forEach((le, i) => {
+        cumulative += value.counts[i];
+        lines.push(`${metric.name}_bucket${formatLabels({ ...labels, le })} ${cumulative}`);
+      });
+      lines.push(`${metric.name}_bucket${formatLabels({ ...labels, le: "+Inf" })} ${value.count}`);
+      lines.push(`${metric.name}_sum${formatLabels(labels)} ${value.sum}`);
+      lines.push(`${metric.name}_count${formatLabels(labels)} ${value.count}`);
+    }
+  }
+  return `${lines.join("\n")}\n`;
+}
+
+/**
+ * Combine snapshots from several processes: counters and histograms add up, while gauges
+ * (heap, lag, queue depth) only make sense per process so they gain a `worker` label.
+ */
+function mergeSnapshots(perWorker) {
+  const merged = new Map();
+  for (const { worker, snapshot } of perWorker) {
+    for (const metric of snapshot) {
+      if (!merged.has(metric.name)) {
+        merged.set(metric.name, { ...metric, values: new Map() });
+      }
+      const target = merged.get(metric.name);
+      for (const { labels, value } of metric.values) {
+        if (metric.type === "gauge") {
+          const withWorker = { ...labels, worker: String(worker) };
+          target.values.set(labelKey(withWorker), { labels: withWorker, value });
+          continue;
+        }
+        const key = labelKey(labels);
+        const existing = target.values.get(key);
+        if (!existing) {
+          const copy = metric.type === "histogram" ? { ...value, counts: [...value.counts] } : value;
+          target.values.set(key, { labels, value: copy });
+        } else if (metric.type === "histogram") {
+          value.counts.forEach((c, i) => {
+            existing.value.counts[i] += c;
+          });
+          existing.value.sum += value.sum;
+          existing.value.count += value.count;
+        } else {
+          existing.value += value;
+        }
+      }
+    }
+  }
+  return [...merged.values()].map((m) => ({ ...m, values: [...m.values.values()] }));
+}
+
+// Serve the text format on its own port so scrapes never queue behind API traffic
+function startMetricsServer(port, getText) {
+  const server = http.createServer(async (req, res) => {
+    if (req.url !== "/metrics") {
+      res.writeHead(404).end();
+      return;
+    }
+    try {
+      const text = await getText();
+      res.writeHead(200, { "Content-Type": "text/plain; version=0.0.4; charset=utf-8" });
+      res.end(text);
+    } catch (err) {
+      res.writeHead(500).end(String(err.message));
+    }
+  });
+  server.listen(port);
+  return server;
+}
+
+const registry = new Registry();
+
+module.exports = {
+  Registry,
+  Counter,
+  Gauge,
+  Histogram,
+  registry,
+  renderSnapshot,
+  mergeSnapshots,
+  startMetricsServer,
+};
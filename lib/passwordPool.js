@@ -0,0 +1,115 @@
+const os = require("os");
+const path = require("path");
+const { Worker } = require("worker_threads");
+const { envInt } = require("./env");
+
+// Raised when the queue is full; routes turn it into 503 so callers back off
+class PasswordPoolBusyError extends Error {
+  constructor() {
+    super("Password hashing is at capacity");
+    this.code = "PASSWORD_POOL_BUSY";
+  }
+}
+
+/**
+ * Bounded pool of worker threads for bcrypt hashing and comparison.
+ *
+ * bcryptjs is pure JavaScript, so a cost-12 hash on the main thread stalls every other
+ * request for hundreds of milliseconds. Here each job runs on one of `size` threads; jobs
+ * beyond that wait in a FIFO queue, and once `maxQueue` are waiting new jobs are refused
+ * straight away rather than piling up behind a login burst.
+ */
+class PasswordPool {
+  constructor({ size, maxQueue, cost }) {
+    this.size = size;
+    this.maxQueue = maxQueue;
+    this.cost = cost;
+    this.workers = []; // { worker, job }
+    this.queue = [];
+    this.nextId = 1;
+    this.stats = { completed: 0, rejected: 0 };
+  }
+
+  hash(password) {
+    return this.run({ op: "hash", password, cost: this.cost });
+  }
+
+  compare(password, hash) {
+    return this.run({ op: "compare", password, hash });
+  }
+
+  queueDepth() {
+    return this.queue.length;
+  }
+
+  busyWorkers() {
+    return this.workers.filter((w) => w.job).length;
+  }
+
+  run(task) {
+    if (this.queue.length >= this.maxQueue) {
+      this.stats.rejected += 1;
+      return Promise.reject(new PasswordPoolBusyError());
+    }
+    return new Promise((resolve, reject) => {
+      this.queue.push({ id: this.nextId++, task, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  dispatch() {
+    while (this.queue.length > 0) {
+      let slot = this.workers.find((w) => !w.job);
+      if (!slot && this.workers.length < this.size) {
+        slot = this.spawn();
+      }
+      if (!slot) return;
+      slot.job = this.queue.shift();
+      slot.worker.postMessage({ id: slot.job.id, ...slot.job.task });
+    }
+  }
+
+  spawn() {
+    const slot = { worker: new Worker(path.join(__dirname, "passwordWorker.js")), job: null };
+    slot.worker.unref();
+
+    slot.worker.on("message", ({ id, result, error }) => {
+      const job = slot.job;
+      if (!job || job.id !== id) return;
+      slot.job = null;
+      this.stats.completed += 1;
+      if (error) job.reject(new Error(error));
+      else job.resolve(result);
+      this.dispatch();
+    });
+
+    // A dead thread fails its current job and is replaced on the next dispatch
+    const fail = (err) => {
+      this.workers = this.workers.filter((w) => w !== slot);
+      if (slot.job) {
+        slot.job.reject(err instanceof Error ? err : new Error(`Password worker exited (${err})`));
+        slot.job = null;
+      }
+      this.dispatch();
+    };
+    slot.worker.on("error", fail);
+    slot.worker.on("exit", fail);
+
+    this.workers.push(slot);
+    return slot;
+  }
+
+  async close() {
+    const workers = this.workers;
+    this.workers = [];
+    await Promise.all(workers.map((w) => w.worker.terminate()));
+  }
+}
+
+const passwordPool = new PasswordPool({
+  size: envInt("BCRYPT_WORKERS", Math.max(1, Math.min(4, os.availableParallelism() - 1))),
+  maxQueue: envInt("BCRYPT_MAX_QUEUE", 64),
+  cost: envInt("BCRYPT_COST", 12),
+});
+
+module.exports = { PasswordPool, PasswordPoolBusyError, passwordPool };
@@ -0,0 +1,13 @@
+// Runs inside a worker thread: bcrypt work here never blocks the HTTP event loop
+const { parentPort } = require("worker_threads");
+const bcrypt = require("bcryptjs");
+
+parentPort.on("message", ({ id, op, password, hash, cost }) => {
+  try {
+    const result =
+      op === "hash" ? bcrypt.hashSync(password, cost) : bcrypt.compareSync(password, hash);
+    parentPort.postMessage({ id, result });
+  } catch (err) {
+    parentPort.postMessage({ id, error: err.message });
+  }
+});
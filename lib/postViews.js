@@ -0,0 +1,43 @@
+// Shapes in which posts are returned by list endpoints (browse, most-active, expired history)
+const clock = require("./clock");
+
+// Characters of the body kept in list views; clients fetch GET /api/posts/:id for the rest
+const LIST_BODY_LENGTH = 280;
+
+// Only the fields a feed needs; fetched with .lean() so no Mongoose documents are built
+const LIST_PROJECTION = {
+  title: 1,
+  topics: 1,
+  body: 1,
+  owner: 1,
+  likesCount: 1,
+  dislikesCount: 1,
+  commentsCount: 1,
+  status: 1,
+  createdAt: 1,
+  expiresAt: 1,
+};
+
+// Published with post events: the list fields plus what most-active needs to answer with
+// the full post straight from the leaderboard
+const EVENT_PROJECTION = { ...LIST_PROJECTION, updatedAt: 1, __v: 1 };
+
+// Live/Expired as of now; the stored status lags until the expiry sweeper catches up
+function computeStatus(expiresAt) {
+  return clock.now() < new Date(expiresAt).getTime() ? "Live" : "Expired";
+}
+
+function toListView(post) {
+  if (typeof post.body === "string" && post.body.length > LIST_BODY_LENGTH) {
+    post.body = post.body.slice(0, LIST_BODY_LENGTH);
+    post.bodyTruncated = true;
+  }
+  return post;
+}
+
+// `?view=full` opts back into every stored field
+function wantsFullView(query) {
+  return String(query.view || "") === "full";
+}
+
+module.exports = { LIST_BODY_LENGTH, LIST_PROJECTION, EVENT_PROJECTION, computeStatus, toListView, wantsFullView };
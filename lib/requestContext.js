@@ -0,0 +1,15 @@
+const { AsyncLocalStorage } = require("async_hooks");
+
+// Carries the current request through async work, so deep code (e.g. DB monitoring) knows who asked
+const storage = new AsyncLocalStorage();
+
+function requestContext(req, res, next) {
+  storage.run({ req }, next);
+}
+
+function currentRequest() {
+  const store = storage.getStore();
+  return store ? store.req : null;
+}
+
+module.exports = { requestContext, currentRequest };
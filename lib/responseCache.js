@@ -0,0 +1,86 @@
+/**
+ * Short-lived cache of serialized responses for the per-topic endpoints.
+ *
+ * Entries are keyed by topic and kind ("most-active", "expired") so writers can drop
+ * exactly what they changed. Misses are single-flight: however many requests arrive for
+ * the same key while it is loading, the loader runs once and they all share the result.
+ * A load that overlaps an invalidation is handed to its waiters but not stored.
+ */
+class ResponseCache {
+  constructor({ ttlMs = 2000, maxEntries = 1000 } = {}) {
+    this.ttlMs = ttlMs;
+    this.maxEntries = maxEntries;
+    this.entries = new Map(); // "topic|kind|key" -> { value, expiresAt }
+    this.inflight = new Map(); // "topic|kind|key" -> Promise
+    this.generations = new Map(); // "topic" or "topic|kind" -> number, bumped on invalidation
+    this.generation = 0; // bumped by invalidateAll
+    this.stats = { hits: 0, misses: 0, coalesced: 0 };
+  }
+
+  // `load` resolves to { status, body } where body is the already-serialized JSON
+  async get(topic, kind, key, load) {
+    const fullKey = `${topic}|${kind}|${key}`;
+    const cached = this.entries.get(fullKey);
+    if (cached && cached.expiresAt > Date.now()) {
+      this.stats.hits += 1;
+      return cached.value;
+    }
+
+    if (this.inflight.has(fullKey)) {
+      this.stats.coalesced += 1;
+      return this.inflight.get(fullKey);
+    }
+
+    this.stats.misses += 1;
+    const version = this.version(topic, kind);
+    const task = Promise.resolve()
+      .then(load)
+      .then((value) => {
+        if (this.version(topic, kind) === version) {
+          this.store(fullKey, value);
+        }
+        return value;
+      })
+      .finally(() => this.inflight.delete(fullKey));
+    this.inflight.set(fullKey, task);
+    return task;
+  }
+
+  store(fullKey, value) {
+    this.entries.delete(fullKey);
+    if (this.entries.size >= this.maxEntries) {
+      // Maps iterate in insertion order, so the first key is the oldest entry
+      this.entries.delete(this.entries.keys().next().value);
+    }
+    this.entries.set(fullKey, { value, expiresAt: Date.now() + this.ttlMs });
+  }
+
+  // Drop one kind of response for a topic, or every kind when `kind` is omitted
+  invalidate(topic, kind) {
+    const scope = kind ? `${topic}|${kind}` : topic;
+    this.generations.set(scope, (this.generations.get(scope) || 0) + 1);
+    const prefix = `${scope}|`;
+    for (const fullKey of this.entries.keys()) {
+      if (fullKey.startsWith(prefix)) {
+        this.entries.delete(fullKey);
+      }
+    }
+  }
+
+  invalidateAll() {
+    this.generation += 1;
+    this.entries.clear();
+  }
+
+  // Changes whenever anything covering (topic, kind) is invalidated
+  version(topic, kind) {
+    const g = this.generations;
+    return `${this.generation}:${g.get(topic) || 0}:${g.get(`${topic}|${kind}`) || 0}`;
+  }
+}
+
+const topicCache = new ResponseCache({
+  ttlMs: Number.parseInt(process.env.TOPIC_CACHE_TTL_MS || "2000", 10),
+});
+
+module.exports = { ResponseCache, topicCache };
@@ -0,0 +1,63 @@
+const { monitorEventLoopDelay } = require("perf_hooks");
+const { registry } = require("./metrics");
+const { passwordPool } = require("./passwordPool");
+const { topicCache } = require("./responseCache");
+const { authCacheStats } = require("../middleware/auth");
+const { openStreamCount } = require("./sse");
+
+// Process-level gauges, refreshed when /metrics is scraped
+function registerRuntimeMetrics() {
+  const loopDelay = monitorEventLoopDelay({ resolution: 10 });
+  loopDelay.enable();
+
+  registry.gauge("mingle_event_loop_lag_seconds", "Event loop delay since the previous scrape", {
+    collect(g) {
+      g.set({ quantile: "0.5" }, loopDelay.percentile(50) / 1e9);
+      g.set({ quantile: "0.99" }, loopDelay.percentile(99) / 1e9);
+      g.set({ quantile: "1" }, loopDelay.max / 1e9);
+      loopDelay.reset();
+    },
+  });
+
+  registry.gauge("mingle_memory_bytes", "Process memory usage by kind", {
+    collect(g) {
+      const mem = process.memoryUsage();
+      g.set({ kind: "heap_used" }, mem.heapUsed);
+      g.set({ kind: "heap_total" }, mem.heapTotal);
+      g.set({ kind: "rss" }, mem.rss);
+      g.set({ kind: "external" }, mem.external);
+    },
+  });
+
+  registry.gauge("mingle_bcrypt_queue_depth", "Password hashing jobs waiting for a worker thread", {
+    collect: (g) => g.set({}, passwordPool.queueDepth()),
+  });
+  registry.gauge("mingle_bcrypt_busy_workers", "Password hashing threads currently working", {
+    collect: (g) => g.set({}, passwordPool.busyWorkers()),
+  });
+  registry.counter("mingle_bcrypt_rejected_total", "Password hashing jobs refused because the queue was full", {
+    collect: (c) => c.set({}, passwordPool.stats.rejected),
+  });
+
+  registry.counter("mingle_auth_token_cache_lookups_total", "Verified-JWT cache lookups by result", {
+    collect(c) {
+      const stats = authCacheStats();
+      c.set({ result: "hit" }, stats.hits);
+      c.set({ result: "miss" }, stats.misses);
+    },
+  });
+
+  registry.gauge("mingle_sse_connections", "Open Server-Sent Events streams", {
+    collect: (g) => g.set({}, openStreamCount()),
+  });
+
+  registry.counter("mingle_topic_cache_lookups_total", "Topic response cache lookups by result", {
+    collect(c) {
+      c.set({ result: "hit" }, topicCache.stats.hits);
+      c.set({ result: "miss" }, topicCache.stats.misses);
+      c.set({ result: "coalesced" }, topicCache.stats.coalesced);
+    },
+  });
+}
+
+module.exports = { registerRuntimeMetrics };
@@ -0,0 +1,156 @@
+const Post = require("../models/Post");
+const CommentBucket = require("../models/CommentBucket");
+const { LIST_PROJECTION } = require("./postViews");
+
+/**
+ * Response serializers compiled from the Mongoose schemas.
+ *
+ * Each shape is turned once, at startup, into a straight-line function that writes the
+ * JSON for exactly the schema's fields, so a response pays neither Mongoose's toJSON nor
+ * JSON.stringify's generic walk over ObjectIds and Dates. Output matches what res.json
+ * would send for the same fields; anything not in the shape is left out.
+ */
+
+// Strings with nothing to escape (the usual case) skip JSON.stringify
+const NEEDS_ESCAPE = /["\\\u0000-\u001f\ud800-\udfff]/;
+
+const encoders = {
+  string(v) {
+    const s = String(v);
+    return NEEDS_ESCAPE.test(s) ? JSON.stringify(s) : `"${s}"`;
+  },
+  number(v) {
+    return Number.isFinite(v) ? String(v) : "null";
+  },
+  boolean(v) {
+    return v ? "true" : "false";
+  },
+  date(v) {
+    const d = v instanceof Date ? v : new Date(v);
+    return Number.isNaN(d.getTime()) ? "null" : `"${d.toISOString()}"`;
+  },
+  objectId(v) {
+    return `"${String(v)}"`;
+  },
+};
+
+const INSTANCE_TYPES = {
+  String: "string",
+  Number: "number",
+  Boolean: "boolean",
+  Date: "date",
+  ObjectId: "objectId",
+  ObjectID: "objectId",
+};
+
+/**
+ * Field descriptors for `names` (or every path) of a schema:
+ * { name, type } for scalars, { name, items } for arrays of scalars,
+ * { name, fields } for nested objects such as owner.
+ */
+function fieldsFromSchema(schema, names) {
+  // _id first, as MongoDB stores it
+  const top = names || [
+    ...new Set(["_id", ...Object.keys(schema.paths).map((p) => p.split(".")[0])].filter((p) => schema.pathType(p) !== "adhocOrUndefined")),
+  ];
+  return top.map((name) => describePath(schema, name));
+}
+
+function describePath(schema, name, prefix = "") {
+  const full = prefix + name;
+  if (schema.pathType(full) === "nested") {
+    const children = [
+      ...new Set(
+        Object.keys(schema.paths)
+          .filter((p) => p.startsWith(`${full}.`))
+          .map((p) => p.slice(full.length + 1).split(".")[0])
+      ),
+    ];
+    return { name, fields: children.map((child) => describePath(schema, child, `${full}.`)) };
+  }
+
+  const path = schema.path(full);
+  if (!path) {
+    throw new Error(`Serializer: no schema path "${full}"`);
+  }
+  if (path.instance === "Array") {
+    const caster = path.embeddedSchemaType || path.caster;
+    return { name, items: INSTANCE_TYPES[caster.instance] || "string" };
+  }
+  return { name, type: INSTANCE_TYPES[path.instance] || "string" };
+}
+
+// Generate the body of a function that serializes object `o` with the given fields
+function objectCode(fields, o, depth) {
+  const c = `c${depth}`;
+  let code = `(() => { let s = "{"; let ${c} = "";\n`;
+  for (const field of fields) {
+    const key = JSON.stringify(field.name);
+    const v = `${o}[${key}]`;
+    let value;
+    if (field.fields) {
+      value = `(${v} === null ? "null" : ${objectCode(field.fields, v, depth + 1)})`;
+    } else if (field.items) {
+      value = `(${v} === null ? "null" : "[" + ${v}.map(enc.${field.items}).join(",") + "]")`;
+    } else {
+      value = `(${v} === null ? "null" : enc.${field.type}(${v}))`;
+    }
+    code += `if (${v} !== undefined) { s += ${c} + ${JSON.stringify(`${key}:`)} + ${value}; ${c} = ","; }\n`;
+  }
+  code += `return s + "}"; })()`;
+  return code;
+}
+
+function compile(fields) {
+  // eslint-disable-next-line no-new-func
+  return new Function("enc", `return function serialize(o) { return ${objectCode(fields, "o", 0)}; };`)(encoders);
+}
+
+function compileArray(serializeOne) {
+  return (items) => `[${items.map(serializeOne).join(",")}]`;
+}
+
+const postListFields = [
+  ...fieldsFromSchema(Post.schema, ["_id", ...Object.keys(LIST_PROJECTION)]),
+  { name: "bodyTruncated", type: "boolean" },
+];
+const postFields = fieldsFromSchema(Post.schema);
+const commentFields = fieldsFromSchema(CommentBucket.schema.path("comments").schema);
+
+const serializePostListItem = compile(postListFields);
+const serializePost = compile(postFields);
+const serializeComment = compile(commentFields);
+
+const serializeVoteResult = compile([
+  { name: "message", type: "string" },
+  { name: "likesCount", type: "number" },
+  { name: "dislikesCount", type: "number" },
+]);
+
+const serializeCommentResult = (result) =>
+  `{"message":${encoders.string(result.message)},"commentsCount":${encoders.number(result.commentsCount)},` +
+  `"comment":${serializeComment(result.comment)}}`;
+
+const serializeCommentPage = (page) =>
+  `{"comments":${compileArray(serializeComment)(page.comments)},` +
+  `"nextCursor":${page.nextCursor === null ? "null" : encoders.string(page.nextCursor)}}`;
+
+// Send an already-serialized JSON body
+function sendSerialized(res, status, body) {
+  return res.status(status).type("json").send(body);
+}
+
+module.exports = {
+  compile,
+  compileArray,
+  fieldsFromSchema,
+  serializePostListItem,
+  serializePostList: compileArray(serializePostListItem),
+  serializePost,
+  serializePosts: compileArray(serializePost),
+  serializeComment,
+  serializeCommentResult,
+  serializeCommentPage,
+  serializeVoteResult,
+  sendSerialized,
+};
@@ -0,0 +1,121 @@
+const { subscribe } = require("./events");
+
+const HEARTBEAT_MS = 15 * 1000;
+
+// Bytes we let queue on a socket before coalescing further updates for that client
+const MAX_BUFFERED_BYTES = 64 * 1024;
+
+// Distinct posts with updates waiting for a stalled client before we give up on it
+const MAX_PENDING = 500;
+
+const MAX_CONNECTIONS = Number.parseInt(process.env.SSE_MAX_CONNECTIONS || "10000", 10);
+
+// Responses currently streaming, so shutdown can end them
+const openStreams = new Set();
+
+// Compact counts-only update; clients already have everything else
+function toDelta(event) {
+  const { post } = event;
+  return {
+    type: event.type,
+    postId: String(post._id),
+    likesCount: post.likesCount,
+    dislikesCount: post.dislikesCount,
+    commentsCount: post.commentsCount,
+  };
+}
+
+/**
+ * Turn the response into a Server-Sent Events stream of deltas for events accepted by
+ * `matches`, until the client goes away.
+ *
+ * A slow client is never allowed to buffer without bound: once its socket is backed up,
+ * further updates are coalesced to the latest counts per post and flushed on 'drain', and
+ * if too many distinct posts pile up the stream is closed so the client reconnects.
+ */
+function openEventStream(req, res, matches) {
+  if (openStreams.size >= MAX_CONNECTIONS) {
+    res.set("Retry-After", "5");
+    return res.status(503).json({ error: "Too many open event streams" });
+  }
+
+  res.status(200).set({
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    Connection: "keep-alive",
+    "X-Accel-Buffering": "no",
+  });
+  res.flushHeaders();
+  res.write("retry: 3000\n\n");
+  openStreams.add(res);
+
+  const pending = new Map(); // postId -> latest delta while the socket is backed up
+  let blocked = false;
+
+  const write = (delta) => {
+    if (!res.write(`event: ${delta.type}\ndata: ${JSON.stringify(delta)}\n\n`) || res.writableLength > MAX_BUFFERED_BYTES) {
+      blocked = true;
+    }
+  };
+
+  let closed = false;
+  const close = () => {
+    if (closed) return;
+    closed = true;
+    openStreams.delete(res);
+    unsubscribe();
+    clearInterval(heartbeat);
+    res.off("drain", onDrain);
+  };
+
+  const onDrain = () => {
+    blocked = false;
+    for (const [postId, delta] of pending) {
+      pending.delete(postId);
+      write(delta);
+      if (blocked) break;
+    }
+  };
+
+  const unsubscribe = subscribe((event) => {
+    if (!event.post || !matches(event)) return;
+    const delta = toDelta(event);
+    if (!blocked) {
+      write(delta);
+      return;
+    }
+    pending.set(delta.postId, delta);
+    if (pending.size > MAX_PENDING) {
+      close();
+      res.end();
+    }
+  });
+
+  const heartbeat = setInterval(() => {
+    if (!blocked) res.write(": ping\n\n");
+  }, HEARTBEAT_MS);
+  heartbeat.unref();
+
+  res.on("drain", onDrain);
+  res.on("close", close);
+  return undefined;
+}
+
+function openStreamCount() {
+  return openStreams.size;
+}
+
+/**
+ * End every open stream and its connection, so a draining server.close() is not held open
+ * by clients that would otherwise never disconnect. EventSource clients reconnect on their
+ * own, to another worker or to the restarted process.
+ */
+function closeAllStreams() {
+  for (const res of [...openStreams]) {
+    const socket = res.socket;
+    res.end();
+    if (socket) socket.end();
+  }
+}
+
+module.exports = { openEventStream, openStreamCount, closeAllStreams };
@@ -0,0 +1,36 @@
+const crypto = require("crypto");
+
+// Distinguishes this process's counters from a previous run's, so old ETags never match after a restart
+const BOOT_ID = crypto.randomBytes(4).toString("hex");
+
+// Bumped whenever a post in the topic is created, voted on, commented on or expired;
+// ALL covers lists that are not filtered by topic
+const ALL = "*";
+const versions = new Map();
+
+function bump(topics) {
+  for (const topic of [...(topics || []), ALL]) {
+    versions.set(topic, (versions.get(topic) || 0) + 1);
+  }
+}
+
+// Every topic at once, e.g. when the sweeper expires posts across topics
+let generation = 0;
+function bumpAll() {
+  generation += 1;
+}
+
+function version(topic) {
+  return `${generation}.${versions.get(topic || ALL) || 0}`;
+}
+
+/**
+ * Weak ETag for a list under `topic` (or every topic), varied by `key` (the query options),
+ * so two different pages of the same topic never share a tag.
+ */
+function listEtag(topic, key) {
+  const digest = crypto.createHash("sha1").update(key).digest("base64url").slice(0, 12);
+  return `W/"${BOOT_ID}.${version(topic)}.${digest}"`;
+}
+
+module.exports = { bump, bumpAll, version, listEtag };
@@ -0,0 +1,24 @@
+const crypto = require("crypto");
+
+/**
+ * Guards operator-only endpoints with the X-Admin-Key header.
+ * When ADMIN_KEY is not configured the endpoints do not exist (404), so nothing is
+ * exposed by default.
+ */
+function adminRequired(req, res, next) {
+  const expected = process.env.ADMIN_KEY;
+  if (!expected) {
+    return res.status(404).json({ error: "Not found" });
+  }
+
+  const given = String(req.headers["x-admin-key"] || "");
+  const a = crypto.createHash("sha256").update(given).digest();
+  const b = crypto.createHash("sha256").update(expected).digest();
+  if (!given || !crypto.timingSafeEqual(a, b)) {
+    return res.status(403).json({ error: "Admin key required" });
+  }
+
+  next();
+}
+
+module.exports = { adminRequired };
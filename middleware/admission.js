@@ -0,0 +1,90 @@
+const { registry } = require("../lib/metrics");
+const { envInt } = require("../lib/env");
+
+// Shed order: expensive auth calls first, then other writes, votes and reads last
+const PRIORITY = { auth: 0, write: 1, interactive: 2 };
+const PRIORITY_NAMES = ["auth", "write", "interactive"];
+
+// Fraction of each limit a priority may use before it is turned away
+const HEADROOM = [0.5, 0.8, 1];
+
+const SAMPLE_MS = 50;
+
+function classify(req) {
+  if (req.path.startsWith("/api/auth/")) {
+    return PRIORITY.auth;
+  }
+  // Votes are as cheap as reads and are what users notice first
+  if (req.method === "GET" || /\/(like|dislike)$/.test(req.path)) {
+    return PRIORITY.interactive;
+  }
+  return PRIORITY.write;
+}
+
+/**
+ * Admission control: refuse work with 503 + Retry-After once the process is overloaded,
+ * instead of accepting everything and letting every response time out.
+ *
+ * Overload is judged on event-loop lag (a smoothed measure of how late a 50 ms timer
+ * fires) and the number of requests in flight. Lower priorities get less headroom, so
+ * register/login are shed first and votes and reads last.
+ */
+function createAdmissionControl({
+  maxLagMs = envInt("ADMISSION_MAX_LAG_MS", 100),
+  maxInflight = envInt("ADMISSION_MAX_INFLIGHT", 1000),
+} = {}) {
+  let lagMs = 0;
+  let inflight = 0;
+
+  let expected = Date.now() + SAMPLE_MS;
+  setInterval(() => {
+    const now = Date.now();
+    const sample = Math.max(0, now - expected);
+    expected = now + SAMPLE_MS;
+    // Rise quickly on a stall, decay over a few samples once it clears
+    lagMs = sample > lagMs ? sample : lagMs * 0.7 + sample * 0.3;
+  }, SAMPLE_MS).unref();
+
+  const rejected = registry.counter(
+    "mingle_admission_rejected_total",
+    "Requests refused by admission control by priority"
+  );
+  registry.gauge("mingle_admission_inflight", "Requests currently admitted and in flight", {
+    collect: (g) => g.set({}, inflight),
+  });
+  registry.gauge("mingle_admission_lag_seconds", "Smoothed event-loop lag used for admission", {
+    collect: (g) => g.set({}, lagMs / 1000),
+  });
+
+  function admission(req, res, next) {
+    const priority = classify(req);
+    const headroom = HEADROOM[priority];
+
+    if (lagMs > maxLagMs * headroom || inflight >= maxInflight * headroom) {
+      rejected.inc({ priority: PRIORITY_NAMES[priority] });
+      res.set("Retry-After", String(Math.max(1, Math.ceil(lagMs / 1000))));
+      return res.status(503).json({ error: "Server overloaded, please retry shortly" });
+    }
+
+    // Event streams stay open for minutes; counting them would soon shed everything else
+    if (req.path.endsWith("/events")) {
+      return next();
+    }
+
+    inflight += 1;
+    let done = false;
+    const release = () => {
+      if (done) return;
+      done = true;
+      inflight -= 1;
+    };
+    res.once("finish", release);
+    res.once("close", release);
+    next();
+  }
+
+  admission.stats = () => ({ lagMs, inflight });
+  return admission;
+}
+
+module.exports = { createAdmissionControl, classify, PRIORITY };
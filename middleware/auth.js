@@ -1,4 +1,65 @@
 const jwt = require("jsonwebtoken");
+const LRUCache = require("../lib/lru");
+
+// Verified tokens, so a client re-sending the same bearer token skips HMAC + JSON parsing
+const tokenCache = new LRUCache(Number.parseInt(process.env.AUTH_CACHE_SIZE || "10000", 10));
+const cacheStats = { hits: 0, misses: 0 };
+
+// The secret the cached entries were verified with; a different one empties the cache
+let cachedSecret = process.env.JWT_SECRET;
+
+/**
+ * Forget every verified token, so the next request with each one is checked against the
+ * current JWT_SECRET again. Called on secret rotation (POST /api/admin/auth-cache/flush,
+ * relayed to every cluster worker) and whenever JWT_SECRET is seen to have changed.
+ */
+function flushAuthCache() {
+  tokenCache.clear();
+  cachedSecret = process.env.JWT_SECRET;
+}
+
+function verifyToken(token) {
+  const secret = process.env.JWT_SECRET;
+  if (secret !== cachedSecret) {
+    flushAuthCache();
+  }
+
+  const cached = tokenCache.get(token);
+  if (cached) {
+    if (cached.expiresAt > Date.now()) {
+      cacheStats.hits += 1;
+      return cached.payload;
+    }
+    tokenCache.delete(token);
+  }
+
+  cacheStats.misses += 1;
+  const payload = jwt.verify(token, secret);
+  // Tokens without an expiry are not cached, since we could never evict them on time
+  if (payload.exp) {
+    tokenCache.set(token, { payload: Object.freeze(payload), expiresAt: payload.exp * 1000 });
+  }
+  return payload;
+}
+
+// Drop expired entries in the background so they do not sit in the cache until evicted
+function pruneExpired() {
+  const now = Date.now();
+  for (const [token, entry] of tokenCache.entries()) {
+    if (entry.expiresAt <= now) tokenCache.delete(token);
+  }
+}
+setInterval(pruneExpired, 60 * 1000).unref();
+
+function authCacheStats() {
+  const lookups = cacheStats.hits + cacheStats.misses;
+  return {
+    ...cacheStats,
+    evictions: tokenCache.evictions,
+    size: tokenCache.size,
+    hitRate: lookups > 0 ? cacheStats.hits / lookups : 0,
+  };
+}
 
 function authRequired(req, res, next) {
   const header = req.headers.authorization || "";
@@ -9,7 +70,7 @@ function authRequired(req, res, next) {
   }
 
   try {
-    const payload = jwt.verify(token, process.env.JWT_SECRET);
+    const payload = verifyToken(token);
     req.user = payload; // { userId, name, email }
     next();
   } catch {
@@ -17,4 +78,4 @@ function authRequired(req, res, next) {
   }
 }
 
-module.exports = { authRequired };
+module.exports = { authRequired, authCacheStats, flushAuthCache };
@@ -0,0 +1,123 @@
+const crypto = require("crypto");
+const zlib = require("zlib");
+const { envInt } = require("../lib/env");
+
+// Bodies smaller than this go out as-is; compressing them costs more than it saves
+const MIN_BYTES = envInt("COMPRESSION_MIN_BYTES", 1024, 0);
+const GZIP_LEVEL = envInt("COMPRESSION_GZIP_LEVEL", 6, 0);
+const BROTLI_QUALITY = envInt("COMPRESSION_BROTLI_QUALITY", 4, 0);
+
+// Pick br or gzip from Accept-Encoding, honouring q-values; br wins ties
+function negotiate(req) {
+  const header = String(req.headers["accept-encoding"] || "");
+  let best = null;
+  let bestQ = 0;
+  for (const part of header.split(",")) {
+    const [name, ...params] = part.trim().toLowerCase().split(";");
+    if (name !== "br" && name !== "gzip") continue;
+    const qParam = params.find((p) => p.trim().startsWith("q="));
+    const q = qParam ? Number.parseFloat(qParam.trim().slice(2)) : 1;
+    if (q > bestQ || (q === bestQ && name === "br")) {
+      best = name;
+      bestQ = q;
+    }
+  }
+  return bestQ > 0 ? best : null;
+}
+
+function brotliOptions(buffer) {
+  return {
+    params: {
+      [zlib.constants.BROTLI_PARAM_QUALITY]: BROTLI_QUALITY,
+      [zlib.constants.BROTLI_PARAM_SIZE_HINT]: buffer.length,
+    },
+  };
+}
+
+// Blocks the event loop; only for bodies compressed once and then reused (cache entries)
+function compressSync(buffer, encoding) {
+  if (encoding === "br") {
+    return zlib.brotliCompressSync(buffer, brotliOptions(buffer));
+  }
+  return zlib.gzipSync(buffer, { level: GZIP_LEVEL });
+}
+
+// Runs on the libuv thread pool, so one-off bodies add no event-loop lag
+function compressAsync(buffer, encoding, callback) {
+  if (encoding === "br") {
+    return zlib.brotliCompress(buffer, brotliOptions(buffer), callback);
+  }
+  return zlib.gzip(buffer, { level: GZIP_LEVEL }, callback);
+}
+
+/**
+ * Compress JSON bodies sent through res.send/res.json once they reach MIN_BYTES.
+ * Compression runs off the event loop and the body is sent when it is done; if it fails,
+ * the body goes out uncompressed. Responses that already carry a Content-Encoding (see
+ * sendPrecompressed) and streamed responses such as SSE are left alone.
+ */
+function compression(req, res, next) {
+  const send = res.send;
+  res.send = function sendCompressed(body) {
+    const compressible =
+      (typeof body === "string" || Buffer.isBuffer(body)) &&
+      req.method !== "HEAD" &&
+      res.statusCode !== 204 &&
+      res.statusCode !== 304 &&
+      !res.getHeader("Content-Encoding");
+
+    if (compressible) {
+      res.vary("Accept-Encoding");
+      const buffer = typeof body === "string" ? Buffer.from(body, "utf8") : body;
+      const encoding = buffer.length >= MIN_BYTES ? negotiate(req) : null;
+      if (encoding) {
+        if (!res.getHeader("Content-Type")) res.type("json");
+        compressAsync(buffer, encoding, (err, compressed) => {
+          if (res.destroyed) return;
+          if (err) {
+            send.call(this, buffer);
+            return;
+          }
+          res.set("Content-Encoding", encoding);
+          send.call(this, compressed);
+        });
+        return this;
+      }
+    }
+    return send.call(this, body);
+  };
+  next();
+}
+
+/**
+ * Send a cached { status, body } entry, compressing it at most once per encoding for the
+ * entry's lifetime, so cache hits pay no compression CPU. The entry's ETag is computed once
+ * too, and a matching If-None-Match gets 304 with no body.
+ */
+function sendPrecompressed(req, res, entry) {
+  res.vary("Accept-Encoding");
+  res.status(entry.status).type("json");
+
+  // The tag describes the uncompressed body, so it is shared by every encoding
+  if (!entry.etag) {
+    entry.etag = `W/"${crypto.createHash("sha1").update(entry.body).digest("base64url")}"`;
+  }
+  res.set("ETag", entry.etag);
+  if (entry.status === 200 && req.fresh) {
+    return res.status(304).end();
+  }
+
+  const encoding = negotiate(req);
+  if (!encoding || Buffer.byteLength(entry.body) < MIN_BYTES) {
+    return res.send(entry.body);
+  }
+
+  if (!entry.encoded) entry.encoded = {};
+  if (!entry.encoded[encoding]) {
+    entry.encoded[encoding] = compressSync(Buffer.from(entry.body, "utf8"), encoding);
+  }
+  res.set("Content-Encoding", encoding);
+  return res.send(entry.encoded[encoding]);
+}
+
+module.exports = { compression, sendPrecompressed, negotiate };
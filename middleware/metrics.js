@@ -0,0 +1,32 @@
+const { registry } = require("../lib/metrics");
+
+const requests = registry.counter(
+  "mingle_http_requests_total",
+  "HTTP requests by route template, method and status class"
+);
+const latency = registry.histogram(
+  "mingle_http_request_duration_seconds",
+  "HTTP request latency by route template and method"
+);
+
+// Route template such as /api/posts/:id/like; raw URLs would explode label cardinality
+function routeLabel(req) {
+  if (!req.route) {
+    return "unmatched";
+  }
+  const path = req.route.path === "/" ? "" : req.route.path;
+  return `${req.baseUrl}${path}` || "/";
+}
+
+function requestMetrics(req, res, next) {
+  const start = process.hrtime.bigint();
+  res.on("finish", () => {
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    const route = routeLabel(req);
+    requests.inc({ method: req.method, route, status: `${Math.floor(res.statusCode / 100)}xx` });
+    latency.observe({ method: req.method, route }, seconds);
+  });
+  next();
+}
+
+module.exports = { requestMetrics, routeLabel };
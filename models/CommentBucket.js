@@ -0,0 +1,33 @@
+const mongoose = require("mongoose");
+
+// Fixed number of comments per bucket document, so hot threads never approach the 16 MB limit
+const COMMENTS_PER_BUCKET = 50;
+
+// Embedded comment schema
+const CommentSchema = new mongoose.Schema(
+  {
+    user: {
+      userId: { type: mongoose.Schema.Types.ObjectId, ref: "User", required: true },
+      name: { type: String, required: true, trim: true, maxlength: 60 },
+    },
+    text: { type: String, required: true, trim: true, minlength: 1, maxlength: 500 },
+    createdAt: { type: Date, default: Date.now },
+  },
+  { _id: true }
+);
+
+// One page of comments for a post; page N holds comments N*COMMENTS_PER_BUCKET onwards
+const CommentBucketSchema = new mongoose.Schema(
+  {
+    postId: { type: mongoose.Schema.Types.ObjectId, ref: "posts", required: true },
+    page: { type: Number, required: true, min: 0 },
+    count: { type: Number, default: 0, min: 0 },
+    comments: { type: [CommentSchema], default: [] },
+  },
+  { timestamps: true }
+);
+
+CommentBucketSchema.index({ postId: 1, page: 1 }, { unique: true });
+
+module.exports = mongoose.model("comment_buckets", CommentBucketSchema);
+module.exports.COMMENTS_PER_BUCKET = COMMENTS_PER_BUCKET;
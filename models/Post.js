@@ -1,20 +1,8 @@
 const mongoose = require("mongoose");
+const clock = require("../lib/clock");
 
 const TOPICS = ["Politics", "Health", "Sport", "Tech"];
 
-// Embedded comment schema
-const CommentSchema = new mongoose.Schema(
-  {
-    user: {
-      userId: { type: mongoose.Schema.Types.ObjectId, ref: "User", required: true },
-      name: { type: String, required: true, trim: true, maxlength: 60 },
-    },
-    text: { type: String, required: true, trim: true, minlength: 1, maxlength: 500 },
-    createdAt: { type: Date, default: Date.now },
-  },
-  { _id: true }
-);
-
 const PostSchema = new mongoose.Schema(
   {
     // Spec: title, topic(s), timestamp, body, expiration, status, owner, likes/dislikes/comments
@@ -46,7 +34,7 @@ const PostSchema = new mongoose.Schema(
     body: { type: String, required: true, trim: true, minlength: 1, maxlength: 2000 },
 
     // Spec: timestamp of registration
-    createdAt: { type: Date, default: Date.now, index: true },
+    createdAt: { type: Date, default: Date.now },
 
     // Spec: expiration time (after which no actions are allowed)
     expiresAt: { type: Date, required: true, index: true },
@@ -65,29 +53,32 @@ const PostSchema = new mongoose.Schema(
       name: { type: String, required: true, trim: true, maxlength: 60 },
     },
 
-    // Counts (fast sorting for “most active”)
+    // Counts (fast sorting for “most active”), denormalised from the votes collection.
+    // Who voted which way lives in models/Vote.js so the post document stays a fixed size.
     likesCount: { type: Number, default: 0, min: 0 },
     dislikesCount: { type: Number, default: 0, min: 0 },
 
-    // To prevent multiple votes by same user:
-    likedBy: [{ type: mongoose.Schema.Types.ObjectId, ref: "User" }],
-    dislikedBy: [{ type: mongoose.Schema.Types.ObjectId, ref: "User" }],
-
-    // Comments list, which is made of JSON objects according the CommentSchema object
-    comments: { type: [CommentSchema], default: [] },
+    // Comments live in fixed-size pages in models/CommentBucket.js; only the total is kept here
+    commentsCount: { type: Number, default: 0, min: 0 },
   },
   { timestamps: true }
 );
 
 // Check that the expired status on the post is updated correctly
 PostSchema.pre("save", async function () {
-  const now = Date.now();
+  const now = clock.now();
   const exp = new Date(this.expiresAt).getTime();
   this.status = now < exp ? "Live" : "Expired";
 });
 
-// Helpful indexes for queries in Actions 3/5/6
-PostSchema.index({ topics: 1, status: 1, createdAt: -1 });
-PostSchema.index({ topics: 1, likesCount: -1, dislikesCount: -1 });
+// Helpful indexes for queries in Actions 3/5/6.
+// The trailing _id matches the keyset cursors' tiebreak, so every page is a plain index seek.
+PostSchema.index({ topics: 1, status: 1, createdAt: -1, _id: -1 });
+PostSchema.index({ topics: 1, createdAt: -1, _id: -1 });
+PostSchema.index({ createdAt: -1, _id: -1 });
+PostSchema.index({ topics: 1, status: 1, expiresAt: -1, _id: -1 });
+// Lets the expiry sweeper find due Live posts without a collection scan
+PostSchema.index({ status: 1, expiresAt: 1 });
+PostSchema.index({ topics: 1, likesCount: -1, dislikesCount: -1, createdAt: -1, _id: -1 });
 
 module.exports = mongoose.model("posts", PostSchema);
@@ -0,0 +1,16 @@
+const mongoose = require("mongoose");
+
+// One document per (post, user) pair; the direction can flip between like and dislike
+const VoteSchema = new mongoose.Schema(
+  {
+    postId: { type: mongoose.Schema.Types.ObjectId, ref: "posts", required: true },
+    userId: { type: mongoose.Schema.Types.ObjectId, ref: "users", required: true },
+    direction: { type: String, enum: ["like", "dislike"], required: true },
+  },
+  { timestamps: true }
+);
+
+// A user can hold at most one vote per post
+VoteSchema.index({ postId: 1, userId: 1 }, { unique: true });
+
+module.exports = mongoose.model("votes", VoteSchema);
@@ -0,0 +1,80 @@
+const express = require("express");
+const { adminRequired } = require("../middleware/admin");
+const { flushAuthCache } = require("../middleware/auth");
+const clock = require("../lib/clock");
+const expirySweeper = require("../lib/expirySweeper");
+
+const router = express.Router();
+
+// Longest single jump the test clock accepts (one year)
+const MAX_CLOCK_OFFSET_MS = 365 * 24 * 60 * 60 * 1000;
+
+// The test clock only exists when ENABLE_TEST_CLOCK=1; otherwise it is a plain 404
+function testClockEnabled(req, res, next) {
+  if (process.env.ENABLE_TEST_CLOCK !== "1") {
+    return res.status(404).json({ error: "Not found" });
+  }
+  next();
+}
+
+function clockState() {
+  return { now: clock.date().toISOString(), offsetMs: clock.offsetMs };
+}
+
+/**
+ * Read the test clock
+ * GET /api/admin/clock
+ */
+router.get("/clock", testClockEnabled, adminRequired, (req, res) => {
+  return res.json(clockState());
+});
+
+/**
+ * Move the test clock
+ * POST /api/admin/clock   { "advanceMs": 75000 } | { "offsetMs": 0 } | { "reset": true }
+ *
+ * Every cluster worker follows (through the primary), and this process sweeps expired posts
+ * before answering, so the next request already sees them as Expired.
+ */
+router.post("/clock", testClockEnabled, adminRequired, async (req, res, next) => {
+  try {
+    let offsetMs;
+    if (req.body.reset === true) {
+      offsetMs = 0;
+    } else if (req.body.advanceMs !== undefined) {
+      offsetMs = clock.offsetMs + Number(req.body.advanceMs);
+    } else if (req.body.offsetMs !== undefined) {
+      offsetMs = Number(req.body.offsetMs);
+    }
+
+    if (!Number.isFinite(offsetMs) || Math.abs(offsetMs) > MAX_CLOCK_OFFSET_MS) {
+      return res.status(400).json({ error: "Send advanceMs, offsetMs or reset: true (at most one year)" });
+    }
+
+    clock.setOffset(offsetMs);
+    if (process.send) {
+      process.send({ type: "clock:set", offsetMs });
+    }
+    await expirySweeper.sweep();
+
+    return res.json(clockState());
+  } catch (err) {
+    return next(err);
+  }
+});
+
+/**
+ * Drop every cached verified token, e.g. after rotating JWT_SECRET
+ * POST /api/admin/auth-cache/flush
+ *
+ * Every cluster worker follows (through the primary).
+ */
+router.post("/auth-cache/flush", adminRequired, (req, res) => {
+  flushAuthCache();
+  if (process.send) {
+    process.send({ type: "auth:flush" });
+  }
+  return res.json({ flushed: true });
+});
+
+module.exports = router;
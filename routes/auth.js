@@ -1,10 +1,18 @@
 const express = require("express");
-const bcrypt = require("bcryptjs");
 const jwt = require("jsonwebtoken");
 const User = require("../models/User");
+const { passwordPool, PasswordPoolBusyError } = require("../lib/passwordPool");
+const LRUCache = require("../lib/lru");
+const { adminRequired } = require("../middleware/admin");
 
 const router = express.Router();
 
+// Largest batch accepted by POST /register/bulk
+const MAX_BULK_USERS = 1000;
+
+// Emails known to be taken; lets a repeat registration fail fast without hashing
+const knownEmails = new LRUCache(Number.parseInt(process.env.KNOWN_EMAILS_CACHE_SIZE || "50000", 10));
+
 function signToken(user) {
   return jwt.sign(
     {
@@ -17,32 +25,66 @@ function signToken(user) {
   );
 }
 
+// The hashing pool is saturated: shed the request instead of queueing it indefinitely
+function sendBusy(res) {
+  res.set("Retry-After", "1");
+  return res.status(503).json({ error: "Server busy, please retry shortly" });
+}
+
+// Returns { error } or the cleaned-up { name, email, password }
+function validateRegistration(body) {
+  const name = String(body.name || "").trim();
+  const email = String(body.email || "").trim().toLowerCase();
+  const password = String(body.password || "");
+
+  if (name.length < 6 || name.length > 60) {
+    return { error: "Name must be between 6 and 60 characters" };
+  }
+  if (!/^\S+@\S+\.\S+$/.test(email) || email.length > 254) {
+    return { error: "Invalid email format" };
+  }
+  if (password.length < 8 || password.length > 30) {
+    return { error: "Password must be between 8 and 30 characters" };
+  }
+  return { name, email, password };
+}
+
+// Duplicate key error raised by the unique index on users.email
+function isDuplicateEmail(err) {
+  return Boolean(err && err.code === 11000 && (!err.keyPattern || err.keyPattern.email));
+}
+
 router.post("/register", async (req, res, next) => {
   try {
-    const name = String(req.body.name || "").trim();
-    const email = String(req.body.email || "").trim().toLowerCase();
-    const password = String(req.body.password || "");
-
     // Validation 1 - check user inputs
-    if (name.length < 6) {
-      return res.status(400).json({ error: "Name must be at least 6 characters" });
-    }
-    if (!/^\S+@\S+\.\S+$/.test(email)) {
-      return res.status(400).json({ error: "Invalid email format" });
-    }
-    if (password.length < 8 || password.length > 30) {
-      return res.status(400).json({ error: "Password must be between 8 and 30 characters" });
+    const input = validateRegistration(req.body);
+    if (input.error) {
+      return res.status(400).json({ error: input.error });
     }
+    const { name, email, password } = input;
 
-    // Validation 2 - check if the user already exists
-    const existing = await User.findOne({ email }).lean();
-    if (existing) {
+    // Validation 2 - cheap in-memory check for emails we have already seen registered,
+    // so repeat sign-ups do not cost a bcrypt hash. MongoDB's unique index is the real check.
+    if (knownEmails.has(email)) {
       return res.status(409).json({ error: "Email already registered" });
     }
 
     // If we get this far, all validations passed so generate a password hash for the password
-    const passwordHash = await bcrypt.hash(password, 12);
-    const user = await User.create({ name, email, passwordHash });
+    // (off the event loop; the cost factor comes from BCRYPT_COST)
+    const passwordHash = await passwordPool.hash(password);
+
+    // Insert straight away; concurrent sign-ups for one email are settled by the unique index
+    let user;
+    try {
+      user = await User.create({ name, email, passwordHash });
+    } catch (err) {
+      if (isDuplicateEmail(err)) {
+        knownEmails.set(email, true);
+        return res.status(409).json({ error: "Email already registered" });
+      }
+      throw err;
+    }
+    knownEmails.set(email, true);
 
     // Generate token for user
     const token = signToken(user);
@@ -52,6 +94,83 @@ router.post("/register", async (req, res, next) => {
       token,
     });
   } catch (err) {
+    if (err instanceof PasswordPoolBusyError) {
+      return sendBusy(res);
+    }
+    return next(err);
+  }
+});
+
+/**
+ * Bulk registration for onboarding imports (operators only)
+ * POST /api/auth/register/bulk   header: X-Admin-Key   body: { users: [{ name, email, password }] }
+ *
+ * Every valid user is inserted with one unordered insertMany; duplicates and invalid rows
+ * are reported back by index without stopping the rest of the batch. No tokens are issued.
+ */
+router.post("/register/bulk", adminRequired, async (req, res, next) => {
+  try {
+    const rows = req.body.users;
+    if (!Array.isArray(rows) || rows.length === 0 || rows.length > MAX_BULK_USERS) {
+      return res.status(400).json({ error: `users must be an array of 1 to ${MAX_BULK_USERS} entries` });
+    }
+
+    const invalid = [];
+    const accepted = []; // { index, name, email, password }
+    const seen = new Set();
+    rows.forEach((row, index) => {
+      const input = validateRegistration(row || {});
+      if (input.error) {
+        invalid.push({ index, error: input.error });
+      } else if (seen.has(input.email)) {
+        invalid.push({ index, error: "Duplicate email within batch" });
+      } else {
+        seen.add(input.email);
+        accepted.push({ index, ...input });
+      }
+    });
+
+    // Hash a pool's worth at a time so the import never floods the shared queue
+    const docs = [];
+    for (let i = 0; i < accepted.length; i += passwordPool.size) {
+      const chunk = accepted.slice(i, i + passwordPool.size);
+      const hashes = await Promise.all(chunk.map((u) => passwordPool.hash(u.password)));
+      chunk.forEach((u, j) => docs.push({ name: u.name, email: u.email, passwordHash: hashes[j] }));
+    }
+
+    const duplicates = [];
+    const failed = new Set(); // docs indexes that were neither inserted nor already registered
+    let inserted = 0;
+    if (docs.length > 0) {
+      try {
+        inserted = (await User.insertMany(docs, { ordered: false })).length;
+      } catch (err) {
+        if (!Array.isArray(err.writeErrors)) {
+          throw err;
+        }
+        for (const writeError of err.writeErrors) {
+          const doc = docs[writeError.index];
+          if (writeError.code === 11000) {
+            duplicates.push(doc.email);
+          } else {
+            failed.add(writeError.index);
+            invalid.push({ index: accepted[writeError.index].index, error: writeError.errmsg });
+          }
+        }
+        inserted = Array.isArray(err.insertedDocs) ? err.insertedDocs.length : docs.length - err.writeErrors.length;
+      }
+    }
+
+    // Only emails that now exist in MongoDB; a failed row must stay free to register
+    docs.forEach((doc, i) => {
+      if (!failed.has(i)) knownEmails.set(doc.email, true);
+    });
+
+    return res.status(201).json({ inserted, duplicates, invalid });
+  } catch (err) {
+    if (err instanceof PasswordPoolBusyError) {
+      return sendBusy(res);
+    }
     return next(err);
   }
 });
@@ -71,9 +190,10 @@ router.post("/login", async (req, res, next) => {
     if (!user) {
       return res.status(401).json({ error: "Invalid credentials" });
     }
+    knownEmails.set(email, true);
 
     // Validation 3 - check if password is correct
-    const ok = await bcrypt.compare(password, user.passwordHash);
+    const ok = await passwordPool.compare(password, user.passwordHash);
     if (!ok) {
       return res.status(401).json({ error: "Invalid credentials" });
     }
@@ -86,6 +206,9 @@ router.post("/login", async (req, res, next) => {
       token,
     });
   } catch (err) {
+    if (err instanceof PasswordPoolBusyError) {
+      return sendBusy(res);
+    }
     return next(err);
   }
 });
@@ -1,7 +1,32 @@
 const express = require("express");
 const mongoose = require("mongoose");
 const Post = require("../models/Post");
+const Vote = require("../models/Vote");
+const CommentBucket = require("../models/CommentBucket");
+const { COMMENTS_PER_BUCKET } = CommentBucket;
+const {
+  encodeCursor,
+  decodeCursor,
+  decodeKeysetCursor,
+  keysetFilter,
+  nextKeysetCursor,
+} = require("../lib/cursor");
+const { LIST_PROJECTION, EVENT_PROJECTION, computeStatus, toListView, wantsFullView } = require("../lib/postViews");
+const {
+  serializePost,
+  serializePosts,
+  serializePostList,
+  serializeVoteResult,
+  serializeCommentResult,
+  serializeCommentPage,
+  sendSerialized,
+} = require("../lib/serializers");
 const { authRequired } = require("../middleware/auth");
+const expirySweeper = require("../lib/expirySweeper");
+const clock = require("../lib/clock");
+const topicVersions = require("../lib/topicVersions");
+const { publish, sharesChanges } = require("../lib/events");
+const { openEventStream } = require("../lib/sse");
 
 const router = express.Router();
 
@@ -16,17 +41,9 @@ function isValidTopicList(topics) {
   return Array.isArray(topics) && topics.length > 0 && topics.every((t) => TOPICS.includes(t));
 }
 
-function computeStatus(expiresAt) {
-  return Date.now() < new Date(expiresAt).getTime() ? "Live" : "Expired";
-}
-
-async function refreshPostStatusIfNeeded(post) {
-  const statusNow = computeStatus(post.expiresAt);
-  if (post.status !== statusNow) {
-    post.status = statusNow;
-    await post.save();
-  }
-  return statusNow;
+// Weak ETag for a single post: any write moves updatedAt, and the status can flip on time alone
+function postEtag(post) {
+  return `W/"${post._id}.${new Date(post.updatedAt).getTime()}.${post.status}"`;
 }
 
 /**
@@ -61,7 +78,7 @@ router.post("/", authRequired, async (req, res, next) => {
       if (mins < 1 || mins > 60 * 24 * 7) {
         return res.status(400).json({ error: "expiresInMinutes must be 1 to 10080 (7 days)" });
       }
-      expiresAt = new Date(Date.now() + mins * 60 * 1000);
+      expiresAt = new Date(clock.now() + mins * 60 * 1000);
     }
 
     if (Number.isNaN(expiresAt.getTime())) {
@@ -81,7 +98,12 @@ router.post("/", authRequired, async (req, res, next) => {
       status: computeStatus(expiresAt),
     });
 
-    return res.status(201).json(post);
+    // Make sure the background sweeper flips this post to Expired on time
+    expirySweeper.schedule(expiresAt);
+    // Leaderboard, topic caches, ETag versions and SSE streams all follow from this
+    publish({ type: "post", post: post.toObject() });
+
+    return sendSerialized(res, 201, serializePost(post.toObject()));
   } catch (err) {
     return next(err);
   }
@@ -89,7 +111,13 @@ router.post("/", authRequired, async (req, res, next) => {
 
 /**
  * Browse posts (Action 3)
- * GET /api/posts?topic=Tech&status=Live&limit=20&skip=0
+ * GET /api/posts?topic=Tech&status=Live&limit=20&cursor=<X-Next-Cursor>&view=list|full
+ *
+ * Pages are keyed on (createdAt, _id): pass the X-Next-Cursor header from one page as
+ * ?cursor= to get the next. The older ?skip= still works when no cursor is given.
+ * Send the ETag back as If-None-Match to get 304 while nothing in the topic has changed.
+ * The ETag only tracks writes this process hears about, so 304s are only given when it
+ * hears about every process's writes (see lib/events.js).
  */
 router.get("/", authRequired, async (req, res, next) => {
   try {
@@ -99,12 +127,21 @@ router.get("/", authRequired, async (req, res, next) => {
 
     // Return only a certain number of posts - by default the limit is 50 which is the maximum.
     // If the number returned is invalid, default to a limit of 20.
-    const limit = Math.min(toInt(req.query.limit, 20), 50);
+    const limit = Math.max(Math.min(toInt(req.query.limit, 20), 50), 1);
+
+    // Continue from where the previous page stopped
+    let after = null;
+    if (req.query.cursor) {
+      after = decodeKeysetCursor(String(req.query.cursor));
+      if (!after) {
+        return res.status(400).json({ error: "Invalid cursor" });
+      }
+    }
 
-    // Skip the first few pages of results - useful for paginating results
-    const skip = Math.max(toInt(req.query.skip, 0), 0);
+    // Legacy offset paging - cost grows with depth, so prefer the cursor
+    const skip = after ? 0 : Math.max(toInt(req.query.skip, 0), 0);
 
-    const filter = {};
+    const filter = after ? keysetFilter("createdAt", after) : {};
 
     // Validation for the filters
     if (topic) {
@@ -121,13 +158,33 @@ router.get("/", authRequired, async (req, res, next) => {
       filter.status = status;
     }
 
-    // Send the result
-    const posts = await Post.find(filter)
-      .sort({ createdAt: -1 })
+    if (req.query.view && !["list", "full"].includes(String(req.query.view))) {
+      return res.status(400).json({ error: "view must be list or full" });
+    }
+    const full = wantsFullView(req.query);
+
+    // Nothing in this topic changed since the client's copy: answer 304 without querying
+    res.set("ETag", topicVersions.listEtag(topic, JSON.stringify([status, limit, skip, req.query.cursor || "", full])));
+    if (sharesChanges() && req.fresh) {
+      return res.status(304).end();
+    }
+
+    // Send the result - a trimmed list view by default, every field with ?view=full
+    const query = Post.find(filter)
+      .sort({ createdAt: -1, _id: -1 })
       .skip(skip)
       .limit(limit);
+    if (!full) {
+      query.select(LIST_PROJECTION);
+    }
+    const posts = await query.lean();
 
-    return res.status(200).json(posts);
+    const nextCursor = nextKeysetCursor(posts, "createdAt", limit);
+    if (nextCursor) {
+      res.set("X-Next-Cursor", nextCursor);
+    }
+
+    return sendSerialized(res, 200, full ? serializePosts(posts) : serializePostList(posts.map(toListView)));
   } catch (err) {
     return next(err);
   }
@@ -145,137 +202,183 @@ router.get("/:id", authRequired, async (req, res, next) => {
       return res.status(400).json({ error: "Invalid post id" });
     }
 
-    const post = await Post.findById(id);
+    const post = await Post.findById(id).lean();
     if (!post) {
       return res.status(404).json({ error: "Post not found" });
     }
 
-    await refreshPostStatusIfNeeded(post);
+    // The sweeper persists expiry in the background; report the exact status without writing
+    post.status = computeStatus(post.expiresAt);
+
+    res.set("ETag", postEtag(post));
+    if (req.fresh) {
+      return res.status(304).end();
+    }
 
-    return res.status(200).json(post);
+    return sendSerialized(res, 200, serializePost(post));
   } catch (err) {
     return next(err);
   }
 });
 
 /**
- * Like a post (Action 4)
- * POST /api/posts/:id/like
+ * Why this user may not vote on the post at all (missing, own post, expired), or null.
+ * Only runs on failure paths; successful votes never pay for this read.
  */
-router.post("/:id/like", authRequired, async (req, res, next) => {
-  try {
-    // Verify that a valid post id has been given
-    const id = String(req.params.id);
-    if (!mongoose.isValidObjectId(id)) {
-      return res.status(400).json({ error: "Invalid post id" });
-    }
+async function voteRefusal(id, userId, direction) {
+  const post = await Post.findById(id).select({ owner: 1, expiresAt: 1 }).lean();
 
-    // Verify the post they are liking exists
-    const post = await Post.findById(id);
-    if (!post) {
-      return res.status(404).json({ error: "Post not found" });
-    }
-
-    // Check if user is liking their own post
-    if (post.owner.userId.toString() === req.user.userId) {
-      return res.status(403).json({ error: "Post owners cannot like their own posts" });
-    }
+  if (!post) {
+    return { status: 404, error: "Post not found" };
+  }
+  if (post.owner.userId.equals(userId)) {
+    return { status: 403, error: `Post owners cannot ${direction} their own posts` };
+  }
+  if (new Date(post.expiresAt).getTime() <= clock.now()) {
+    return { status: 403, error: "Post expired; no further interactions allowed" };
+  }
+  return null;
+}
 
-    // Check if the post the user is liking is expired
-    const statusNow = await refreshPostStatusIfNeeded(post);
-    if (statusNow !== "Live") {
-      return res.status(403).json({ error: "Post expired; no further interactions allowed" });
-    }
+/**
+ * Record a like or dislike.
+ * The vote itself is an upsert against the unique (postId, userId) index in the votes
+ * collection, so "already voted this way" is enforced by MongoDB. The post only carries the
+ * denormalised counters, bumped by one conditional update that enforces "not the owner" and
+ * "still live". Neither step grows with the number of voters a post already has.
+ */
+async function castVote(id, userId, direction) {
+  const counter = direction === "like" ? "likesCount" : "dislikesCount";
+  const oppositeCounter = direction === "like" ? "dislikesCount" : "likesCount";
 
-    // Check if the user has already like this post
-    const userId = new mongoose.Types.ObjectId(req.user.userId);
-    const alreadyLiked = post.likedBy.some((x) => x.equals(userId));
-    if (alreadyLiked) {
-      return res.status(409).json({ error: "You already liked this post" });
-    }
-    // If disliked before, remove dislike (toggle)
-    const wasDisliked = post.dislikedBy.some((x) => x.equals(userId));
-    if (wasDisliked) {
-      post.dislikedBy = post.dislikedBy.filter((x) => !x.equals(userId));
-      post.dislikesCount = Math.max(0, post.dislikesCount - 1);
+  // Matches no vote yet (insert) or a vote the other way (toggle); a same-way vote
+  // falls through to the insert and trips the unique index instead
+  let previous;
+  try {
+    previous = await Vote.findOneAndUpdate(
+      { postId: id, userId, direction: { $ne: direction } },
+      { $set: { direction } },
+      { upsert: true, new: false, projection: { direction: 1 } }
+    ).lean();
+  } catch (err) {
+    if (err && err.code === 11000) {
+      // A missing, own or expired post still answers 404/403 rather than 409
+      const refusal = await voteRefusal(id, userId, direction);
+      return { ok: false, ...(refusal || { status: 409, error: `You already ${direction}d this post` }) };
     }
+    throw err;
+  }
 
-    // Increment the likes count on the post
-    post.likedBy.push(userId);
-    post.likesCount += 1;
+  const inc = { [counter]: 1 };
+  if (previous) {
+    inc[oppositeCounter] = -1;
+  }
 
-    // Attempt to send the API request for adding a like
-    await post.save();
+  // Put the votes collection back the way it was when the counters were not moved
+  const revertVote = () =>
+    previous
+      ? Vote.updateOne({ postId: id, userId }, { $set: { direction: previous.direction } })
+      : Vote.deleteOne({ postId: id, userId, direction });
 
-    return res.status(200).json({
-      message: "Liked",
-      likesCount: post.likesCount,
-      dislikesCount: post.dislikesCount,
-    });
+  let post;
+  try {
+    post = await Post.findOneAndUpdate(
+      { _id: id, "owner.userId": { $ne: userId }, expiresAt: { $gt: clock.date() } },
+      { $inc: inc },
+      { new: true, projection: EVENT_PROJECTION }
+    ).lean();
   } catch (err) {
-    return next(err);
+    // Keep the vote and the counters in step, so a retry is not told it already voted
+    await revertVote();
+    throw err;
   }
-});
 
+  if (!post) {
+    // The post refused the vote
+    await revertVote();
+    // Expired in the instant between the update and this read counts as expired
+    const refusal = await voteRefusal(id, userId, direction);
+    return { ok: false, ...(refusal || { status: 403, error: "Post expired; no further interactions allowed" }) };
+  }
+  publish({ type: "vote", post });
+  return { ok: true, post };
+}
 
-/**
- * Dislike a post (Action 4)
- * POST /api/posts/:id/dislike
- */
-router.post("/:id/dislike", authRequired, async (req, res, next) => {
-  try {
-    // Verify that a valid post id has been given
-    const id = String(req.params.id);
-    if (!mongoose.isValidObjectId(id)) {
-      return res.status(400).json({ error: "Invalid post id" });
-    }
+function voteHandler(direction) {
+  return async (req, res, next) => {
+    try {
+      // Verify that a valid post id has been given
+      const id = String(req.params.id);
+      if (!mongoose.isValidObjectId(id)) {
+        return res.status(400).json({ error: "Invalid post id" });
+      }
 
-    // Verify the post they are disliking exists
-    const post = await Post.findById(id);
-    if (!post) {
-      return res.status(404).json({ error: "Post not found" });
-    }
+      const userId = new mongoose.Types.ObjectId(req.user.userId);
+      const result = await castVote(new mongoose.Types.ObjectId(id), userId, direction);
+      if (!result.ok) {
+        return res.status(result.status).json({ error: result.error });
+      }
 
-    // Check if user is disliking their own post
-    if (post.owner.userId.toString() === req.user.userId) {
-      return res.status(403).json({ error: "Post owners cannot dislike their own posts" });
+      return sendSerialized(
+        res,
+        200,
+        serializeVoteResult({
+          message: direction === "like" ? "Liked" : "Disliked",
+          likesCount: result.post.likesCount,
+          dislikesCount: result.post.dislikesCount,
+        })
+      );
+    } catch (err) {
+      return next(err);
     }
+  };
+}
 
-    // Check if the post the user is liking is expired
-    const statusNow = await refreshPostStatusIfNeeded(post);
-    if (statusNow !== "Live") {
-      return res.status(403).json({ error: "Post expired; no further interactions allowed" });
-    }
+/**
+ * Live counts for one post as Server-Sent Events
+ * GET /api/posts/:id/events   -> "vote" / "comment" events: { postId, likesCount, dislikesCount, commentsCount }
+ */
+router.get("/:id/events", authRequired, (req, res) => {
+  const id = String(req.params.id);
+  if (!mongoose.isValidObjectId(id)) {
+    return res.status(400).json({ error: "Invalid post id" });
+  }
+  return openEventStream(req, res, (event) => String(event.post._id) === id);
+});
 
-    // Check if the user has already disliked this post
-    const userId = new mongoose.Types.ObjectId(req.user.userId);
-    const alreadyDisliked = post.dislikedBy.some((x) => x.equals(userId));
-    if (alreadyDisliked) {
-      return res.status(409).json({ error: "You already disliked this post" });
-    }
+/**
+ * Like a post (Action 4)
+ * POST /api/posts/:id/like
+ */
+router.post("/:id/like", authRequired, voteHandler("like"));
 
-    // If liked before, remove like (toggle)
-    const wasLiked = post.likedBy.some((x) => x.equals(userId));
-    if (wasLiked) {
-      post.likedBy = post.likedBy.filter((x) => !x.equals(userId));
-      post.likesCount = Math.max(0, post.likesCount - 1);
-    }
+/**
+ * Dislike a post (Action 4)
+ * POST /api/posts/:id/dislike
+ */
+router.post("/:id/dislike", authRequired, voteHandler("dislike"));
 
-    // Increment the dislikes count on the post
-    post.dislikedBy.push(userId);
-    post.dislikesCount += 1;
+/**
+ * Append a comment to the post's current bucket, creating the bucket on first use.
+ * Two commenters racing to create the same bucket both upsert; the loser retries once.
+ */
+async function appendToBucket(postId, page, comment) {
+  const write = () =>
+    CommentBucket.updateOne(
+      { postId, page },
+      { $push: { comments: comment }, $inc: { count: 1 } },
+      { upsert: true }
+    );
 
-    // Attempt to send the API request for adding a dislike
-    await post.save();
-    return res.status(200).json({
-      message: "Disliked",
-      likesCount: post.likesCount,
-      dislikesCount: post.dislikesCount,
-    });
+  try {
+    await write();
   } catch (err) {
-    return next(err);
+    if (!err || err.code !== 11000) {
+      throw err;
+    }
+    await write();
   }
-});
+}
 
 /**
  * Comment on a post (Action 4)
@@ -293,32 +396,96 @@ router.post("/:id/comments", authRequired, async (req, res, next) => {
       return res.status(400).json({ error: "Comment must be 1–500 characters" });
     }
 
-    const post = await Post.findById(id);
-    if (!post) {
-      return res.status(404).json({ error: "Post not found" });
-    }
+    // Reserve a sequence number for the comment; the filter refuses expired posts
+    const post = await Post.findOneAndUpdate(
+      { _id: id, expiresAt: { $gt: clock.date() } },
+      { $inc: { commentsCount: 1 } },
+      { new: true, projection: EVENT_PROJECTION }
+    ).lean();
 
-    const statusNow = await refreshPostStatusIfNeeded(post);
-    if (statusNow !== "Live") {
+    if (!post) {
+      const exists = await Post.exists({ _id: id });
+      if (!exists) {
+        return res.status(404).json({ error: "Post not found" });
+      }
       return res.status(403).json({ error: "Post expired; no further interactions allowed" });
     }
 
-    post.comments.push({
+    const comment = {
+      _id: new mongoose.Types.ObjectId(),
       user: {
         userId: req.user.userId,
         name: req.user.name,
       },
       text,
       createdAt: new Date(),
-    });
+    };
+    const page = Math.floor((post.commentsCount - 1) / COMMENTS_PER_BUCKET);
+
+    try {
+      await appendToBucket(post._id, page, comment);
+    } catch (err) {
+      // Give the reserved slot back so commentsCount stays truthful
+      await Post.updateOne({ _id: post._id }, { $inc: { commentsCount: -1 } });
+      throw err;
+    }
 
-    await post.save();
+    publish({ type: "comment", post });
+
+    return sendSerialized(
+      res,
+      201,
+      serializeCommentResult({
+        message: "Comment added",
+        commentsCount: post.commentsCount,
+        comment,
+      })
+    );
+  } catch (err) {
+    return next(err);
+  }
+});
 
-    return res.status(201).json({
-      message: "Comment added",
-      commentsCount: post.comments.length,
-      comment: post.comments[post.comments.length - 1],
-    });
+/**
+ * List comments on a post, oldest first, one bucket per page
+ * GET /api/posts/:id/comments?cursor=<nextCursor from the previous page>
+ */
+router.get("/:id/comments", authRequired, async (req, res, next) => {
+  try {
+    const id = String(req.params.id);
+    if (!mongoose.isValidObjectId(id)) {
+      return res.status(400).json({ error: "Invalid post id" });
+    }
+
+    let page = 0;
+    if (req.query.cursor) {
+      const cursor = decodeCursor(String(req.query.cursor));
+      if (!cursor || !Number.isInteger(cursor.page) || cursor.page < 0) {
+        return res.status(400).json({ error: "Invalid cursor" });
+      }
+      page = cursor.page;
+    }
+
+    const bucket = await CommentBucket.findOne({ postId: id, page })
+      .select({ comments: 1, count: 1 })
+      .lean();
+
+    if (!bucket) {
+      const exists = await Post.exists({ _id: id });
+      if (!exists) {
+        return res.status(404).json({ error: "Post not found" });
+      }
+      return sendSerialized(res, 200, serializeCommentPage({ comments: [], nextCursor: null }));
+    }
+
+    // A full bucket means the next page may already exist. A short one can still be followed
+    // by another page when a failed comment gave its slot back after later comments had
+    // moved on, so check for it then (only ever on the last page or two).
+    const hasNext =
+      bucket.count >= COMMENTS_PER_BUCKET || (await CommentBucket.exists({ postId: id, page: page + 1 }));
+    const nextCursor = hasNext ? encodeCursor({ page: page + 1 }) : null;
+
+    return sendSerialized(res, 200, serializeCommentPage({ comments: bucket.comments, nextCursor }));
   } catch (err) {
     return next(err);
   }
@@ -1,15 +1,35 @@
 const express = require("express");
 const Post = require("../models/Post");
 const { authRequired } = require("../middleware/auth");
+const { sendPrecompressed } = require("../middleware/compression");
+const { openEventStream } = require("../lib/sse");
+const leaderboard = require("../lib/leaderboard");
+const { MAX_K } = leaderboard;
+const { topicCache } = require("../lib/responseCache");
+const { serializePost, serializePostList, serializePosts } = require("../lib/serializers");
+const { toListView } = require("../lib/postViews");
+const { decodeKeysetCursor, keysetFilter, nextKeysetCursor } = require("../lib/cursor");
 
 const router = express.Router();
 
 const TOPICS = ["Politics", "Health", "Sport", "Tech"];
 
+// Replay a cached { status, body, nextCursor } without serializing or compressing again
+function sendCached(req, res, entry) {
+  if (entry.nextCursor) {
+    res.set("X-Next-Cursor", entry.nextCursor);
+  }
+  return sendPrecompressed(req, res, entry);
+}
+
 /**
  * Most active post per topic (Action 5)
  * Definition (per spec): highest likes, then dislikes (tie-breaker: newest)
- * GET /api/topics/:topic/most-active
+ * GET /api/topics/:topic/most-active          -> the single most active post, in full
+ * GET /api/topics/:topic/most-active?k=5      -> the top 5, most active first
+ *
+ * Served from the in-memory leaderboard, which is kept current on every vote and post,
+ * through a short-lived response cache that routes/post.js invalidates on writes.
  */
 router.get("/:topic/most-active", authRequired, async (req, res, next) => {
   try {
@@ -19,20 +39,28 @@ router.get("/:topic/most-active", authRequired, async (req, res, next) => {
       return res.status(400).json({ error: `topic must be one of: ${TOPICS.join(", ")}` });
     }
 
-    const post = await Post.findOne({
-      topics: topic,
-    })
-      .sort({
-        likesCount: -1,
-        dislikesCount: -1,
-        createdAt: -1,
-      });
-
-    if (!post) {
-      return res.status(404).json({ error: "No posts found for this topic" });
+    let k = null;
+    if (req.query.k !== undefined) {
+      k = Number.parseInt(req.query.k, 10);
+      if (!Number.isInteger(k) || k < 1 || k > MAX_K) {
+        return res.status(400).json({ error: `k must be 1 to ${MAX_K}` });
+      }
     }
 
-    return res.status(200).json(post);
+    const entry = await topicCache.get(topic, "most-active", String(k), async () => {
+      const posts = await leaderboard.top(topic, k || 1);
+
+      if (k !== null) {
+        return { status: 200, body: serializePostList(posts.map(toListView)) };
+      }
+      // Without ?k the answer stays the full post, as it always was
+      if (posts.length === 0) {
+        return { status: 404, body: JSON.stringify({ error: "No posts found for this topic" }) };
+      }
+      return { status: 200, body: serializePost(posts[0]) };
+    });
+
+    return sendCached(req, res, entry);
   } catch (err) {
     return next(err);
   }
@@ -40,7 +68,10 @@ router.get("/:topic/most-active", authRequired, async (req, res, next) => {
 
 /**
  * Expired posts history per topic (Action 6)
- * GET /api/topics/:topic/expired?limit=20&skip=0
+ * GET /api/topics/:topic/expired?limit=20&cursor=<X-Next-Cursor>
+ *
+ * Pages are keyed on (expiresAt, _id); ?skip= is still honoured when no cursor is given.
+ * Responses are cached per topic until the expiry sweeper expires more posts.
  */
 router.get("/:topic/expired", authRequired, async (req, res, next) => {
   try {
@@ -50,21 +81,54 @@ router.get("/:topic/expired", authRequired, async (req, res, next) => {
       return res.status(400).json({ error: `topic must be one of: ${TOPICS.join(", ")}` });
     }
 
-    const limit = Math.min(Number.parseInt(req.query.limit || "20", 10), 50);
-    const skip = Math.max(Number.parseInt(req.query.skip || "0", 10), 0);
+    const limit = Math.max(Math.min(Number.parseInt(req.query.limit || "20", 10) || 20, 50), 1);
+
+    let after = null;
+    if (req.query.cursor) {
+      after = decodeKeysetCursor(String(req.query.cursor));
+      if (!after) {
+        return res.status(400).json({ error: "Invalid cursor" });
+      }
+    }
+    const skip = after ? 0 : Math.max(Number.parseInt(req.query.skip || "0", 10) || 0, 0);
+
+    const key = `${limit}|${skip}|${req.query.cursor || ""}`;
+    const entry = await topicCache.get(topic, "expired", key, async () => {
+      const posts = await Post.find({
+        ...(after ? keysetFilter("expiresAt", after) : {}),
+        topics: topic,
+        status: "Expired",
+      })
+        .sort({ expiresAt: -1, _id: -1 })
+        .skip(skip)
+        .limit(limit)
+        .lean();
 
-    const posts = await Post.find({
-      topics: topic,
-      status: "Expired",
-    })
-      .sort({ expiresAt: -1 })
-      .skip(skip)
-      .limit(limit);
+      return {
+        status: 200,
+        body: serializePosts(posts),
+        nextCursor: nextKeysetCursor(posts, "expiresAt", limit),
+      };
+    });
 
-    return res.status(200).json(posts);
+    return sendCached(req, res, entry);
   } catch (err) {
     return next(err);
   }
 });
 
+/**
+ * Live counts for every post in a topic as Server-Sent Events
+ * GET /api/topics/:topic/events   -> "post" / "vote" / "comment" events with compact counts
+ */
+router.get("/:topic/events", authRequired, (req, res) => {
+  const topic = String(req.params.topic);
+
+  if (!TOPICS.includes(topic)) {
+    return res.status(400).json({ error: `topic must be one of: ${TOPICS.join(", ")}` });
+  }
+
+  return openEventStream(req, res, (event) => (event.post.topics || []).includes(topic));
+});
+
 module.exports = router;
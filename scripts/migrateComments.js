@@ -0,0 +1,77 @@
+/**
+ * One-off migration: move the comments embedded in posts created before comment buckets
+ * existed into models/CommentBucket.js pages, set commentsCount, and drop the array.
+ *
+ * Comments already written to buckets since the deploy are kept, after the older embedded
+ * ones, and the post's pages are rewritten in order. Run it while comment writes are
+ * paused: a comment added to a post while that post is being rewritten can be lost.
+ * Safe to run more than once.
+ *
+ * Run: npm run migrate:comments
+ */
+require("dotenv/config");
+const mongoose = require("mongoose");
+const Post = require("../models/Post");
+const CommentBucket = require("../models/CommentBucket");
+const { COMMENTS_PER_BUCKET } = CommentBucket;
+
+const BATCH_SIZE = 100;
+
+function toBuckets(postId, comments) {
+  const buckets = [];
+  for (let start = 0; start < comments.length; start += COMMENTS_PER_BUCKET) {
+    const page = comments.slice(start, start + COMMENTS_PER_BUCKET);
+    buckets.push({ postId, page: buckets.length, count: page.length, comments: page });
+  }
+  return buckets;
+}
+
+async function migratePost(post) {
+  const existing = await CommentBucket.find({ postId: post._id }).sort({ page: 1 }).lean();
+  const comments = [...(post.comments || []), ...existing.flatMap((bucket) => bucket.comments)];
+
+  if (existing.length > 0) {
+    await CommentBucket.deleteMany({ postId: post._id });
+  }
+  if (comments.length > 0) {
+    await CommentBucket.insertMany(toBuckets(post._id, comments));
+  }
+
+  await Post.collection.updateOne(
+    { _id: post._id },
+    { $set: { commentsCount: comments.length }, $unset: { comments: "" } }
+  );
+}
+
+async function migrateComments() {
+  // The array is no longer in the schema, so read it through the raw collection
+  const cursor = Post.collection.find(
+    { comments: { $exists: true } },
+    { projection: { comments: 1 }, batchSize: BATCH_SIZE }
+  );
+
+  let posts = 0;
+  for await (const post of cursor) {
+    await migratePost(post);
+    posts += 1;
+  }
+
+  // Posts that never had a comment still need the counter for lean reads
+  const { modifiedCount } = await Post.collection.updateMany(
+    { commentsCount: { $exists: false } },
+    { $set: { commentsCount: 0 } }
+  );
+  return { posts, zeroed: modifiedCount };
+}
+
+mongoose
+  .connect(process.env.DB_CONNECTOR)
+  .then(migrateComments)
+  .then(({ posts, zeroed }) => {
+    console.log(`Moved comments of ${posts} posts into buckets; ${zeroed} posts without comments counted`);
+    return mongoose.disconnect();
+  })
+  .catch((err) => {
+    console.error("Comment migration failed:", err.message);
+    process.exit(1);
+  });
@@ -0,0 +1,73 @@
+/**
+ * One-off migration: move the likedBy/dislikedBy arrays of posts created before the votes
+ * collection existed into one Vote per (post, user), then recount the post's counters
+ * from the votes collection and drop the arrays.
+ *
+ * Safe to run more than once, and while the API is up: votes are upserted with
+ * $setOnInsert, so a vote cast since the deploy is kept as it is.
+ *
+ * Run: npm run migrate:votes
+ */
+require("dotenv/config");
+const mongoose = require("mongoose");
+const Post = require("../models/Post");
+const Vote = require("../models/Vote");
+
+const BATCH_SIZE = 500;
+
+function voteUpserts(postId, userIds, direction) {
+  return (userIds || []).map((userId) => ({
+    updateOne: {
+      filter: { postId, userId },
+      update: { $setOnInsert: { direction } },
+      upsert: true,
+    },
+  }));
+}
+
+async function recount(postId) {
+  const counts = await Vote.aggregate([
+    { $match: { postId } },
+    { $group: { _id: "$direction", n: { $sum: 1 } } },
+  ]);
+  const count = (direction) => (counts.find((c) => c._id === direction) || { n: 0 }).n;
+  return { likesCount: count("like"), dislikesCount: count("dislike") };
+}
+
+async function migrateVotes() {
+  // The arrays are no longer in the schema, so read them through the raw collection
+  const cursor = Post.collection.find(
+    { $or: [{ likedBy: { $exists: true } }, { dislikedBy: { $exists: true } }] },
+    { projection: { likedBy: 1, dislikedBy: 1 }, batchSize: BATCH_SIZE }
+  );
+
+  let posts = 0;
+  let votes = 0;
+  for await (const post of cursor) {
+    // Likes first: a user somehow in both arrays keeps the like
+    const ops = [...voteUpserts(post._id, post.likedBy, "like"), ...voteUpserts(post._id, post.dislikedBy, "dislike")];
+    if (ops.length > 0) {
+      const result = await Vote.bulkWrite(ops, { ordered: false });
+      votes += result.upsertedCount;
+    }
+
+    await Post.collection.updateOne(
+      { _id: post._id },
+      { $set: await recount(post._id), $unset: { likedBy: "", dislikedBy: "" } }
+    );
+    posts += 1;
+  }
+  return { posts, votes };
+}
+
+mongoose
+  .connect(process.env.DB_CONNECTOR)
+  .then(migrateVotes)
+  .then(({ posts, votes }) => {
+    console.log(`Migrated ${posts} posts, ${votes} votes created`);
+    return mongoose.disconnect();
+  })
+  .catch((err) => {
+    console.error("Vote migration failed:", err.message);
+    process.exit(1);
+  });
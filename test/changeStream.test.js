@@ -0,0 +1,118 @@
+// Replica-set stand-in for lib/changeStream.js: Post.watch returns a fake change stream,
+// so echo suppression, resume and resync run without MongoDB.
+// Run: npm test
+const { test, beforeEach } = require("node:test");
+const assert = require("node:assert");
+const path = require("node:path");
+const { EventEmitter } = require("node:events");
+
+// Stand-in for models/Post: watch() hands out fake streams the test drives by hand
+const streams = [];
+const fakePost = {
+  watch(pipeline, options) {
+    const stream = new EventEmitter();
+    stream.options = options;
+    stream.close = async () => {};
+    streams.push(stream);
+    return stream;
+  },
+};
+const postPath = path.join(__dirname, "..", "models", "Post.js");
+require.cache[postPath] = { id: postPath, filename: postPath, loaded: true, exports: fakePost };
+
+const { PostChangeStream } = require("../lib/changeStream");
+const { publish, subscribe } = require("../lib/events");
+
+const BATCH_MS = 5;
+const wait = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+let consumer;
+let delivered;
+let unsubscribe;
+
+function post(id, likesCount, updatedAt) {
+  return {
+    _id: id,
+    topics: ["Tech"],
+    likesCount,
+    dislikesCount: 0,
+    commentsCount: 0,
+    updatedAt: new Date(updatedAt),
+  };
+}
+
+function vote(stream, token, doc) {
+  stream.emit("change", {
+    _id: { _data: token },
+    operationType: "update",
+    updateDescription: { updatedFields: { likesCount: doc.likesCount } },
+    fullDocument: doc,
+  });
+}
+
+beforeEach(() => {
+  if (consumer) consumer.stop();
+  if (unsubscribe) unsubscribe();
+  streams.length = 0;
+  consumer = new PostChangeStream({ batchMs: BATCH_MS });
+  consumer.start();
+  delivered = [];
+  unsubscribe = subscribe((event) => delivered.push(event));
+});
+
+test("the echo of a local publish is dropped", async () => {
+  const doc = post("p1", 1, 1000);
+  publish({ type: "vote", post: doc });
+  vote(streams[0], "t1", { ...doc });
+  await wait(BATCH_MS * 4);
+  assert.strictEqual(delivered.length, 1);
+});
+
+test("a later change with the same counts is still delivered", async () => {
+  publish({ type: "vote", post: post("p2", 1, 1000) });
+  // Coalescing skipped the echo and went straight to a newer state
+  vote(streams[0], "t1", post("p2", 2, 2000));
+  await wait(BATCH_MS * 4);
+  // Another process toggles back to likes=1
+  vote(streams[0], "t2", post("p2", 1, 3000));
+  await wait(BATCH_MS * 4);
+  assert.deepStrictEqual(
+    delivered.map((e) => e.post.likesCount),
+    [1, 2, 1]
+  );
+});
+
+test("changes from other processes are delivered, latest state per post", async () => {
+  vote(streams[0], "t1", post("p3", 1, 1000));
+  vote(streams[0], "t2", post("p3", 2, 2000));
+  await wait(BATCH_MS * 4);
+  assert.strictEqual(delivered.length, 1);
+  assert.strictEqual(delivered[0].post.likesCount, 2);
+});
+
+test("a network error reopens the stream from the last resume token", async () => {
+  vote(streams[0], "t1", post("p4", 1, 1000));
+  // Every change resets the backoff, so shorten it afterwards
+  consumer.retryMs = 1;
+  streams[0].emit("error", Object.assign(new Error("connection reset"), { code: 6 }));
+  await wait(BATCH_MS * 4);
+  assert.strictEqual(streams.length, 2);
+  assert.deepStrictEqual(streams[1].options.resumeAfter, { _data: "t1" });
+});
+
+test("a lost resume token resyncs and reopens from now", async () => {
+  vote(streams[0], "t1", post("p5", 1, 1000));
+  await wait(BATCH_MS * 4);
+  consumer.retryMs = 1;
+  delivered.length = 0;
+  streams[0].emit("error", Object.assign(new Error("history lost"), { code: 286 }));
+  await wait(BATCH_MS * 4);
+  assert.deepStrictEqual(delivered, [{ type: "expired" }]);
+  assert.strictEqual(streams.length, 2);
+  assert.strictEqual(streams[1].options.resumeAfter, undefined);
+});
+
+test.after(() => {
+  consumer.stop();
+  unsubscribe();
+});
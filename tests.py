@@ -4,22 +4,197 @@ A script for running all the designated test cases for the Mingle API
 
 Install:
   pip install requests
+  pip install aiohttp        (only for --load)
 
 Run:
   python tests.py http://<VM_IP>:<VM_PORT>
-"""
 
-import sys
-import time
-import requests
+TC17 waits 75 seconds for a post to expire unless the server runs with
+ENABLE_TEST_CLOCK=1 and ADMIN_KEY set, and MINGLE_ADMIN_KEY holds the same key;
+then the server clock is moved forward instead:
+  MINGLE_ADMIN_KEY=<key> python tests.py http://<VM_IP>:<VM_PORT>
 
+Load mode (the same register -> login -> create -> browse -> vote -> comment flow,
+run by many concurrent virtual users):
+  python tests.py http://<VM_IP>:<VM_PORT> --load --users 200 --ramp-up 20 --duration 60 --think-time 0.5
 
-def post_json(url, data, headers=None):
-    return requests.post(url, json=data, headers=headers)
+Open-loop mode (browse and like/dislike requests at a fixed arrival rate, whether or not
+the server keeps up; latency is measured from when each request was due):
+  python tests.py http://<VM_IP>:<VM_PORT> --open-loop --rate 200 --arrivals poisson --duration 60
+"""
 
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from urllib.parse import urlsplit
 
-def get(url, headers=None, params=None):
-    return requests.get(url, headers=headers, params=params)
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connections each simulated user may hold open to the API
+POOL_SIZE = 4
+
+# Where every run writes its latency report
+BENCH_OUTPUT = "bench_output.txt"
+
+# Histogram precision: values below 2**SUB_BUCKET_BITS microseconds are exact,
+# larger ones keep SUB_BUCKET_BITS - 1 significant bits (~0.1% relative error)
+SUB_BUCKET_BITS = 11
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+OBJECT_ID = re.compile(r"^[0-9a-fA-F]{24}$")
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of latencies in microseconds."""
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def index(value):
+        if value < SUB_BUCKET_COUNT:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value >> shift) - SUB_BUCKET_HALF
+
+    @staticmethod
+    def highest_equivalent(index):
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+        sub = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+        return ((sub + 1) << shift) - 1
+
+    def record(self, micros):
+        micros = max(0, int(micros))
+        i = self.index(micros)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.total += 1
+        self.max = max(self.max, micros)
+
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        rank = max(1, int(self.total * p / 100 + 0.5))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(self.highest_equivalent(i), self.max)
+        return self.max
+
+
+def route_template(method, url):
+    """'POST http://host/api/posts/65f.../like' -> 'POST /api/posts/:id/like'."""
+    parts = urlsplit(url).path.rstrip("/").split("/")
+    for i, part in enumerate(parts):
+        if OBJECT_ID.match(part):
+            parts[i] = ":id"
+        elif i == 3 and parts[1:3] == ["api", "topics"]:
+            parts[i] = ":topic"
+    return f"{method.upper()} {'/'.join(parts) or '/'}"
+
+
+class Bench:
+    """Latency, error and throughput figures per endpoint for one run.
+
+    An error is a transport failure or a 5xx; the 4xx answers the test cases
+    provoke on purpose are counted as ordinary responses.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = {}
+        self.started = time.monotonic()
+
+    def record(self, method, url, seconds, status):
+        key = route_template(method, url)
+        hist = self.histograms.setdefault(key, LatencyHistogram())
+        hist.record(seconds * 1e6)
+        if status is None or status >= 500:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self, mode):
+        elapsed = time.monotonic() - self.started
+        endpoints = {}
+        for key in sorted(self.histograms):
+            hist = self.histograms[key]
+            row = {"count": hist.total}
+            for p in PERCENTILES:
+                row[f"p{p:g}_ms"] = round(hist.percentile(p) / 1000, 3)
+            row["max_ms"] = round(hist.max / 1000, 3)
+            row["error_rate"] = round(self.errors.get(key, 0) / hist.total, 4)
+            row["rps"] = round(hist.total / elapsed, 2)
+            endpoints[key] = row
+        total = sum(h.total for h in self.histograms.values())
+        return {
+            "mode": mode,
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "rps": round(total / elapsed, 2) if elapsed else 0,
+            "endpoints": endpoints,
+        }
+
+    def report(self, mode, path=BENCH_OUTPUT):
+        summary = self.summary(mode)
+        print_step(f"Latency ({mode}): {summary['requests']} requests in {summary['elapsed_s']}s, {summary['rps']} req/s")
+        print(f"  {'endpoint':<42}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'p99.9':>9}{'max':>9}{'err%':>7}{'rps':>8}")
+        for key, row in summary["endpoints"].items():
+            print(
+                f"  {key:<42}{row['count']:>7}"
+                + "".join(f"{row[f'p{p:g}_ms']:>9.1f}" for p in PERCENTILES)
+                + f"{row['max_ms']:>9.1f}{row['error_rate'] * 100:>7.1f}{row['rps']:>8.1f}"
+            )
+        print("  (latencies in ms)")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"  Written to {path}")
+
+
+BENCH = Bench()
+
+
+class TimedSession(requests.Session):
+    """A requests session that records the wall-clock time of every request."""
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            r = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            BENCH.record(method, url, time.perf_counter() - started, None)
+            raise
+        BENCH.record(method, url, time.perf_counter() - started, r.status_code)
+        return r
+
+
+def make_session():
+    """One persistent session per simulated user, so requests reuse pooled connections."""
+    session = TimedSession()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def post_json(session, url, data, headers=None):
+    return session.post(url, json=data, headers=headers)
+
+
+def get(session, url, headers=None, params=None):
+    return session.get(url, headers=headers, params=params)
 
 
 def auth_headers(token):
@@ -45,9 +220,49 @@ def try_json(resp):
         return None
 
 
-def register(base, name, email, password):
+# Response shapes, mirroring the serializers compiled from models/Post.js
+POST_LIST_FIELDS = {
+    "_id": str,
+    "title": str,
+    "topics": list,
+    "body": str,
+    "owner": dict,
+    "likesCount": int,
+    "dislikesCount": int,
+    "commentsCount": int,
+    "status": str,
+    "createdAt": str,
+    "expiresAt": str,
+}
+POST_LIST_OPTIONAL = {"bodyTruncated": bool}
+POST_FULL_FIELDS = dict(POST_LIST_FIELDS, updatedAt=str)
+POST_FULL_OPTIONAL = {"__v": int}
+
+
+def check_shape(label, obj, fields, optional=None):
+    optional = optional or {}
+    problems = []
+    if not isinstance(obj, dict):
+        problems.append("not an object")
+    else:
+        for key, typ in fields.items():
+            if key not in obj:
+                problems.append(f"missing {key}")
+            elif not isinstance(obj[key], typ):
+                problems.append(f"{key} is {type(obj[key]).__name__}")
+        for key in obj:
+            if key not in fields and key not in optional:
+                problems.append(f"unexpected {key}")
+        owner = obj.get("owner")
+        if isinstance(owner, dict) and set(owner) != {"userId", "name"}:
+            problems.append("owner must have userId and name")
+    show_expected_actual(label, "matches schema", "; ".join(problems) or "matches schema")
+    return not problems
+
+
+def register(session, base, name, email, password):
     url = f"{base}/api/auth/register"
-    r = post_json(url, {"name": name, "email": email, "password": password})
+    r = post_json(session, url, {"name": name, "email": email, "password": password})
     show_expected_actual(
         f"Register {name}",
         "201 Created (or 409 if already registered)",
@@ -56,9 +271,9 @@ def register(base, name, email, password):
     return r
 
 
-def login(base, email, password):
+def login(session, base, email, password):
     url = f"{base}/api/auth/login"
-    r = post_json(url, {"email": email, "password": password})
+    r = post_json(session, url, {"email": email, "password": password})
     show_expected_actual(
         f"Login {email}",
         "200 OK + token",
@@ -69,12 +284,16 @@ def login(base, email, password):
         data = try_json(r)
         if data:
             tok = data.get("token")
+    if tok:
+        # Every later request from this user carries the token on the same session
+        session.headers.update(auth_headers(tok))
     return tok
 
 
-def create_post(base, token, title, topics, body, expires_in_minutes):
+def create_post(session, base, title, topics, body, expires_in_minutes):
     url = f"{base}/api/posts"
     r = post_json(
+        session,
         url,
         {
             "title": title,
@@ -82,7 +301,6 @@ def create_post(base, token, title, topics, body, expires_in_minutes):
             "body": body,
             "expiresInMinutes": expires_in_minutes,
         },
-        headers=auth_headers(token),
     )
     show_expected_actual(
         f"Create post '{title}'",
@@ -99,9 +317,9 @@ def create_post(base, token, title, topics, body, expires_in_minutes):
     return post_id
 
 
-def browse_topic(base, token, topic):
+def browse_topic(session, base, topic):
     url = f"{base}/api/posts"
-    r = get(url, headers=auth_headers(token), params={"topic": topic})
+    r = get(session, url, params={"topic": topic})
     show_expected_actual(
         f"Browse topic={topic}",
         "200 OK + list of posts",
@@ -115,9 +333,22 @@ def browse_topic(base, token, topic):
     return []
 
 
-def like(base, token, post_id, who=""):
+def get_post(session, base, post_id):
+    url = f"{base}/api/posts/{post_id}"
+    r = get(session, url)
+    show_expected_actual(
+        "Get single post",
+        "200 OK + post JSON",
+        f"{r.status_code}",
+    )
+    if r.status_code == 200:
+        return try_json(r)
+    return None
+
+
+def like(session, base, post_id, who=""):
     url = f"{base}/api/posts/{post_id}/like"
-    r = requests.post(url, headers=auth_headers(token))
+    r = session.post(url)
     label = f"Like post ({who})" if who else "Like post"
     show_expected_actual(
         label,
@@ -127,9 +358,9 @@ def like(base, token, post_id, who=""):
     return r
 
 
-def dislike(base, token, post_id, who=""):
+def dislike(session, base, post_id, who=""):
     url = f"{base}/api/posts/{post_id}/dislike"
-    r = requests.post(url, headers=auth_headers(token))
+    r = session.post(url)
     label = f"Dislike post ({who})" if who else "Dislike post"
     show_expected_actual(
         label,
@@ -139,9 +370,9 @@ def dislike(base, token, post_id, who=""):
     return r
 
 
-def comment(base, token, post_id, text, who=""):
+def comment(session, base, post_id, text, who=""):
     url = f"{base}/api/posts/{post_id}/comments"
-    r = post_json(url, {"text": text}, headers=auth_headers(token))
+    r = post_json(session, url, {"text": text})
     label = f"Comment ({who})" if who else "Comment"
     show_expected_actual(
         label,
@@ -151,9 +382,31 @@ def comment(base, token, post_id, text, who=""):
     return r
 
 
-def most_active(base, token, topic):
+def list_comments(session, base, post_id):
+    url = f"{base}/api/posts/{post_id}/comments"
+    comments = []
+    cursor = None
+    while True:
+        params = {"cursor": cursor} if cursor else None
+        r = get(session, url, params=params)
+        if r.status_code != 200:
+            break
+        data = try_json(r) or {}
+        comments.extend(data.get("comments", []))
+        cursor = data.get("nextCursor")
+        if not cursor:
+            break
+    show_expected_actual(
+        "List comments",
+        "200 OK + pages of comments",
+        f"{r.status_code}",
+    )
+    return comments
+
+
+def most_active(session, base, topic):
     url = f"{base}/api/topics/{topic}/most-active"
-    r = get(url, headers=auth_headers(token))
+    r = get(session, url)
     show_expected_actual(
         f"Most active topic={topic}",
         "200 OK + one post",
@@ -164,9 +417,9 @@ def most_active(base, token, topic):
     return None
 
 
-def expired_by_topic(base, token, topic):
+def expired_by_topic(session, base, topic):
     url = f"{base}/api/topics/{topic}/expired"
-    r = get(url, headers=auth_headers(token))
+    r = get(session, url)
     show_expected_actual(
         f"Expired posts topic={topic}",
         "200 OK + [] if none",
@@ -177,6 +430,20 @@ def expired_by_topic(base, token, topic):
     return None
 
 
+def advance_clock(session, base, seconds):
+    """Move the server's test clock forward; False when the endpoint is not available."""
+    key = os.environ.get("MINGLE_ADMIN_KEY")
+    if not key:
+        return False
+    r = post_json(session, f"{base}/api/admin/clock", {"advanceMs": int(seconds * 1000)}, headers={"X-Admin-Key": key})
+    show_expected_actual(
+        f"Advance server clock {seconds}s",
+        "200 OK (404 if ENABLE_TEST_CLOCK is off)",
+        f"{r.status_code}",
+    )
+    return r.status_code == 200
+
+
 def find_post(posts, post_id):
     for p in posts:
         if p.get("_id") == post_id:
@@ -184,12 +451,328 @@ def find_post(posts, post_id):
     return None
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python mingle_tests_simple.py http://<VM_IP>:3000")
+# ---------------------------------------------------------------------------
+# Load generation (--load)
+# ---------------------------------------------------------------------------
+
+LOAD_TOPICS = ["Politics", "Health", "Sport", "Tech"]
+
+
+class LoadStats:
+    """Request counts per step and status code, shared by all virtual users."""
+
+    def __init__(self):
+        self.counts = {}
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def record(self, step, status):
+        key = (step, status)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def total(self):
+        return sum(self.counts.values()) + self.errors
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        print_step("Load results")
+        for (step, status), n in sorted(self.counts.items()):
+            print(f"  {step:<10} {status}: {n}")
+        print(f"  transport errors: {self.errors}")
+        print(f"  total requests:   {self.total()} in {elapsed:.1f}s ({self.total() / elapsed:.1f} req/s)")
+
+
+async def load_request(client, stats, step, method, url, token=None, **kwargs):
+    headers = auth_headers(token) if token else None
+    started = time.perf_counter()
+    try:
+        async with client.request(method, url, headers=headers, **kwargs) as resp:
+            body = await resp.read()
+            data = json.loads(body) if resp.status < 300 and body else None
+            BENCH.record(method, url, time.perf_counter() - started, resp.status)
+            stats.record(step, resp.status)
+            return resp.status, data
+    except Exception:
+        BENCH.record(method, url, time.perf_counter() - started, None)
+        stats.errors += 1
+        return None, None
+
+
+async def think(think_time):
+    if think_time > 0:
+        await asyncio.sleep(random.uniform(0.5 * think_time, 1.5 * think_time))
+
+
+async def load_user(client, stats, base, name, email):
+    """Register and log in one generated user; returns the token or None."""
+    password = "StrongPass123"
+    await load_request(
+        client, stats, "register", "POST", f"{base}/api/auth/register",
+        json={"name": name, "email": email, "password": password},
+    )
+    status, data = await load_request(
+        client, stats, "login", "POST", f"{base}/api/auth/login",
+        json={"email": email, "password": password},
+    )
+    return data.get("token") if status == 200 and data else None
+
+
+async def virtual_user(client, base, index, run_id, start_delay, deadline, think_time, stats):
+    await asyncio.sleep(start_delay)
+    token = await load_user(client, stats, base, f"LoadUser{index:05d}", f"load-{run_id}-{index}@mingle.com")
+    if not token:
+        return
+
+    while time.monotonic() < deadline:
+        topic = random.choice(LOAD_TOPICS)
+        await load_request(
+            client, stats, "create", "POST", f"{base}/api/posts", token,
+            json={
+                "title": f"Load post {index}",
+                "topics": [topic],
+                "body": "Generated by tests.py --load",
+                "expiresInMinutes": 10,
+            },
+        )
+        await think(think_time)
+
+        _, posts = await load_request(client, stats, "browse", "GET", f"{base}/api/posts", token, params={"topic": topic})
+        await think(think_time)
+
+        if posts:
+            target = random.choice(posts)["_id"]
+            vote = random.choice(["like", "dislike"])
+            await load_request(client, stats, vote, "POST", f"{base}/api/posts/{target}/{vote}", token)
+            await think(think_time)
+
+            await load_request(
+                client, stats, "comment", "POST", f"{base}/api/posts/{target}/comments", token,
+                json={"text": f"Load comment from {index}"},
+            )
+            await think(think_time)
+
+
+async def run_load(base, users, ramp_up, duration, think_time, connections):
+    try:
+        import aiohttp
+    except ImportError:
+        print("Load mode needs aiohttp: pip install aiohttp")
         sys.exit(1)
 
-    base = sys.argv[1].rstrip("/")
+    print_step(f"Load: {users} virtual users, {ramp_up}s ramp-up, {duration}s duration, {think_time}s think time")
+    stats = LoadStats()
+    run_id = uuid.uuid4().hex[:8]
+    deadline = time.monotonic() + ramp_up + duration
+    connector = aiohttp.TCPConnector(limit=connections)
+    timeout = aiohttp.ClientTimeout(total=30)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        await asyncio.gather(*(
+            virtual_user(
+                client, base, i, run_id,
+                ramp_up * i / max(users, 1), deadline, think_time, stats,
+            )
+            for i in range(users)
+        ))
+
+    stats.report()
+    BENCH.report("load")
+
+
+# ---------------------------------------------------------------------------
+# Open-loop generation (--open-loop)
+# ---------------------------------------------------------------------------
+
+# Topic the open-loop target posts are created in and browsed from
+OPEN_LOOP_TOPIC = "Tech"
+
+
+class OpenLoopStats:
+    """What happened to each scheduled arrival."""
+
+    def __init__(self, late_ms):
+        self.late_s = late_ms / 1000
+        self.scheduled = 0
+        self.sent = 0
+        self.dropped = 0
+        self.pairs_busy = 0
+        self.late = 0
+        self.worst_start_lag = 0.0
+
+    def started(self, lag):
+        self.sent += 1
+        self.worst_start_lag = max(self.worst_start_lag, lag)
+        if lag > self.late_s:
+            self.late += 1
+
+    def report(self, duration):
+        print_step("Open-loop results")
+        print(f"  scheduled: {self.scheduled} ({self.scheduled / duration:.1f}/s)")
+        print(f"  sent:      {self.sent}")
+        print(f"  dropped:   {self.dropped} (in-flight limit reached when due)")
+        print(f"  no voter:  {self.pairs_busy} (every voter/post pair already had a vote in flight)")
+        print(f"  late:      {self.late} (sent more than {self.late_s * 1000:g}ms after due)")
+        print(f"  worst send lag: {self.worst_start_lag * 1000:.1f}ms")
+
+
+async def timed_request(client, bench, stats, due, method, url, token, **kwargs):
+    """Send one request and record its latency measured from `due`, not from when it went out."""
+    stats.started(time.perf_counter() - due)
+    status = None
+    try:
+        async with client.request(method, url, headers=auth_headers(token), **kwargs) as resp:
+            await resp.read()
+            status = resp.status
+    except Exception:
+        pass
+    bench.record(method, url, time.perf_counter() - due, status)
+    return status
+
+
+async def vote_and_release(request, busy, next_vote, pair, vote):
+    """Await a vote, then free its pair; the direction only flips once the server holds `vote`."""
+    try:
+        status = await request
+        # 409 means an earlier vote that timed out or failed had in fact been applied
+        if status in (200, 409):
+            next_vote[pair] = "dislike" if vote == "like" else "like"
+        return status
+    finally:
+        busy.discard(pair)
+
+
+async def run_open_loop(base, rate, arrivals, duration, voters, target_posts, browse_share,
+                        max_inflight, late_ms, connections):
+    try:
+        import aiohttp
+    except ImportError:
+        print("Open-loop mode needs aiohttp: pip install aiohttp")
+        sys.exit(1)
+
+    print_step(f"Open loop: {rate}/s {arrivals} arrivals for {duration}s, {voters} voters on {target_posts} posts")
+    run_id = uuid.uuid4().hex[:8]
+    setup = LoadStats()
+    connector = aiohttp.TCPConnector(limit=connections)
+    timeout = aiohttp.ClientTimeout(total=30)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+        # Setup: one owner with the target posts, and voters who never own them
+        owner = await load_user(client, setup, base, "OpenLoopOwner", f"open-{run_id}-owner@mingle.com")
+        tokens = await asyncio.gather(*(
+            load_user(client, setup, base, f"OpenLoop{i:05d}", f"open-{run_id}-{i}@mingle.com")
+            for i in range(voters)
+        ))
+        tokens = [t for t in tokens if t]
+        posts = []
+        for i in range(target_posts if owner else 0):
+            status, data = await load_request(
+                client, setup, "create", "POST", f"{base}/api/posts", owner,
+                json={
+                    "title": f"Open loop target {i}",
+                    "topics": [OPEN_LOOP_TOPIC],
+                    "body": "Generated by tests.py --open-loop",
+                    "expiresInMinutes": 60 * 24,
+                },
+            )
+            if status == 201 and data:
+                posts.append(data["_id"])
+        if not tokens or not posts:
+            print("  Setup failed: no voters or no target posts")
+            setup.report()
+            return
+
+        # Every (voter, post) pair flips like -> dislike -> like, so each vote is a real change
+        # (200). A pair is never voted on twice at once, which would turn the second into a 409.
+        pairs = [(token, post) for token in tokens for post in posts]
+        next_vote = {}
+        busy = set()
+        pair_index = 0
+
+        bench = Bench()
+        stats = OpenLoopStats(late_ms)
+        inflight = set()
+        start = time.perf_counter()
+        due = start
+
+        while True:
+            due += random.expovariate(rate) if arrivals == "poisson" else 1 / rate
+            if due - start >= duration:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            stats.scheduled += 1
+            if len(inflight) >= max_inflight:
+                stats.dropped += 1
+                continue
+
+            if random.random() < browse_share:
+                request = timed_request(
+                    client, bench, stats, due, "GET", f"{base}/api/posts", tokens[0],
+                    params={"topic": OPEN_LOOP_TOPIC},
+                )
+            else:
+                for _ in range(len(pairs)):
+                    pair = pairs[pair_index]
+                    pair_index = (pair_index + 1) % len(pairs)
+                    if pair not in busy:
+                        break
+                else:
+                    stats.pairs_busy += 1
+                    continue
+                vote = next_vote.get(pair, "like")
+                busy.add(pair)
+                token, post_id = pair
+                request = timed_request(client, bench, stats, due, "POST", f"{base}/api/posts/{post_id}/{vote}", token)
+                request = vote_and_release(request, busy, next_vote, pair, vote)
+
+            task = asyncio.ensure_future(request)
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+
+        if inflight:
+            await asyncio.gather(*inflight)
+
+    stats.report(duration)
+    bench.report("open-loop")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mingle API test cases and load generator")
+    parser.add_argument("base", help="API base URL, e.g. http://<VM_IP>:3000")
+    parser.add_argument("--load", action="store_true", help="run the scenario as concurrent virtual users")
+    parser.add_argument("--users", type=int, default=50, help="virtual users (default 50)")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="seconds to start all users (default 10)")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds at full load after ramp-up (default 60)")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean pause between a user's steps (default 0.5)")
+    parser.add_argument("--connections", type=int, default=100, help="shared connection pool size (default 100)")
+    parser.add_argument("--open-loop", action="store_true", help="send browse/vote requests at a fixed arrival rate")
+    parser.add_argument("--rate", type=float, default=50.0, help="open loop: requests per second (default 50)")
+    parser.add_argument("--arrivals", choices=["poisson", "uniform"], default="poisson", help="open loop: arrival process")
+    parser.add_argument("--posts", type=int, default=10, help="open loop: posts to vote on (default 10)")
+    parser.add_argument("--browse-share", type=float, default=0.5, help="open loop: share of arrivals that browse (default 0.5)")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="open loop: arrivals beyond this many in flight are dropped")
+    parser.add_argument("--late-ms", type=float, default=10.0, help="open loop: a request sent this much after due is late")
+    args = parser.parse_args()
+    if args.open_loop and args.rate <= 0:
+        parser.error("--rate must be positive")
+    return args
+
+
+def main():
+    args = parse_args()
+    base = args.base.rstrip("/")
+
+    if args.load:
+        asyncio.run(run_load(base, args.users, args.ramp_up, args.duration, args.think_time, args.connections))
+        return
+    if args.open_loop:
+        asyncio.run(run_open_loop(
+            base, args.rate, args.arrivals, args.duration, args.users, args.posts, args.browse_share,
+            args.max_inflight, args.late_ms, args.connections,
+        ))
+        return
+
     password = "StrongPass123"
 
     # TC1 / TC2
@@ -201,12 +784,14 @@ def main():
         ("Nestor", "nestor@mingle.com"),
     ]
 
+    sessions = {name: make_session() for name, _ in users}
+
     for name, email in users:
-        register(base, name, email, password)
+        register(sessions[name], base, name, email, password)
 
     tokens = {}
     for name, email in users:
-        tok = login(base, email, password)
+        tok = login(sessions[name], base, email, password)
         tokens[name] = tok
 
     if not all(tokens.values()):
@@ -215,7 +800,8 @@ def main():
 
     # TC3
     print_step("TC3: Unauthorised request (no token)")
-    r = get(f"{base}/api/posts", params={"topic": "Tech"})
+    with make_session() as anonymous:
+        r = get(anonymous, f"{base}/api/posts", params={"topic": "Tech"})
     show_expected_actual(
         "Browse Tech without token",
         "401 Unauthorized",
@@ -224,9 +810,9 @@ def main():
 
     # TC4/5/6
     print_step("TC4/TC5/TC6: Create Tech posts (Olga, Nick, Mary)")
-    olga_post = create_post(base, tokens["Olga"], "Olga Tech Post", ["Tech"], "Olga: Hello Tech!", 5)
-    nick_post = create_post(base, tokens["Nick"], "Nick Tech Post", ["Tech"], "Nick: Tech thoughts.", 5)
-    mary_post = create_post(base, tokens["Mary"], "Mary Tech Post", ["Tech"], "Mary: AI topic.", 5)
+    olga_post = create_post(sessions["Olga"], base, "Olga Tech Post", ["Tech"], "Olga: Hello Tech!", 5)
+    nick_post = create_post(sessions["Nick"], base, "Nick Tech Post", ["Tech"], "Nick: Tech thoughts.", 5)
+    mary_post = create_post(sessions["Mary"], base, "Mary Tech Post", ["Tech"], "Mary: AI topic.", 5)
 
     if not (olga_post and nick_post and mary_post):
         print("\nOne or more posts failed to create. Stopping early.")
@@ -234,23 +820,23 @@ def main():
 
     # TC7
     print_step("TC7: Browse Tech posts (Nick + Olga)")
-    tech_posts_nick = browse_topic(base, tokens["Nick"], "Tech")
-    tech_posts_olga = browse_topic(base, tokens["Olga"], "Tech")
+    tech_posts_nick = browse_topic(sessions["Nick"], base, "Tech")
+    tech_posts_olga = browse_topic(sessions["Olga"], base, "Tech")
     print("  (Just a note) Expecting to see at least 3 posts total.")
 
     # TC8
     print_step("TC8: Nick and Olga like Mary's Tech post")
-    show_expected_actual("Nick likes Mary", "200 OK", like(base, tokens["Nick"], mary_post, who="Nick").status_code)
-    show_expected_actual("Olga likes Mary", "200 OK", like(base, tokens["Olga"], mary_post, who="Olga").status_code)
+    show_expected_actual("Nick likes Mary", "200 OK", like(sessions["Nick"], base, mary_post, who="Nick").status_code)
+    show_expected_actual("Olga likes Mary", "200 OK", like(sessions["Olga"], base, mary_post, who="Olga").status_code)
 
     # TC9
     print_step("TC9: Nestor likes Nick's post and dislikes Mary's post")
-    show_expected_actual("Nestor likes Nick", "200 OK", like(base, tokens["Nestor"], nick_post, who="Nestor").status_code)
-    show_expected_actual("Nestor dislikes Mary", "200 OK", dislike(base, tokens["Nestor"], mary_post, who="Nestor").status_code)
+    show_expected_actual("Nestor likes Nick", "200 OK", like(sessions["Nestor"], base, nick_post, who="Nestor").status_code)
+    show_expected_actual("Nestor dislikes Mary", "200 OK", dislike(sessions["Nestor"], base, mary_post, who="Nestor").status_code)
 
     # TC10
     print_step("TC10: Nick browses Tech posts (check counts)")
-    tech_posts = browse_topic(base, tokens["Nick"], "Tech")
+    tech_posts = browse_topic(sessions["Nick"], base, "Tech")
     p_mary = find_post(tech_posts, mary_post)
     p_nick = find_post(tech_posts, nick_post)
 
@@ -258,7 +844,7 @@ def main():
     if p_mary:
         show_expected_actual("Mary likes", "2", str(p_mary.get("likesCount")))
         show_expected_actual("Mary dislikes", "1", str(p_mary.get("dislikesCount")))
-        show_expected_actual("Mary comments", "0", str(len(p_mary.get("comments", []))))
+        show_expected_actual("Mary comments", "0", str(p_mary.get("commentsCount")))
     else:
         print("  Couldn't find Mary's post in the list (unexpected).")
 
@@ -267,9 +853,16 @@ def main():
     else:
         print("  Couldn't find Nick's post in the list (unexpected).")
 
+    print("\nResponse shapes:")
+    if p_mary:
+        check_shape("Browse list item", p_mary, POST_LIST_FIELDS, POST_LIST_OPTIONAL)
+    full_mary = get_post(sessions["Nick"], base, mary_post)
+    if full_mary:
+        check_shape("Single post", full_mary, POST_FULL_FIELDS, POST_FULL_OPTIONAL)
+
     # TC11
     print_step("TC11: Mary tries to like her own post (should fail)")
-    r = like(base, tokens["Mary"], mary_post, who="Mary (self-like)")
+    r = like(sessions["Mary"], base, mary_post, who="Mary (self-like)")
     show_expected_actual(
         "Mary self-like",
         "403 Forbidden (or 409 Conflict depending on your API)",
@@ -282,25 +875,27 @@ def main():
 
     # TC12
     print_step("TC12: Nick and Olga comment on Mary's post (2 each)")
-    comment(base, tokens["Nick"], mary_post, "Nick comment #1", who="Nick")
-    comment(base, tokens["Olga"], mary_post, "Olga comment #1", who="Olga")
-    comment(base, tokens["Nick"], mary_post, "Nick comment #2", who="Nick")
-    comment(base, tokens["Olga"], mary_post, "Olga comment #2", who="Olga")
+    comment(sessions["Nick"], base, mary_post, "Nick comment #1", who="Nick")
+    comment(sessions["Olga"], base, mary_post, "Olga comment #1", who="Olga")
+    comment(sessions["Nick"], base, mary_post, "Nick comment #2", who="Nick")
+    comment(sessions["Olga"], base, mary_post, "Olga comment #2", who="Olga")
 
     # TC13
     print_step("TC13: Nick browses Tech (see comments)")
-    tech_posts = browse_topic(base, tokens["Nick"], "Tech")
+    tech_posts = browse_topic(sessions["Nick"], base, "Tech")
     p_mary = find_post(tech_posts, mary_post)
     if p_mary:
-        show_expected_actual("Mary comments count", "4", str(len(p_mary.get("comments", []))))
+        show_expected_actual("Mary comments count", "4", str(p_mary.get("commentsCount")))
+        mary_comments = list_comments(sessions["Nick"], base, mary_post)
+        show_expected_actual("Mary comments listed", "4", str(len(mary_comments)))
     else:
         print("  Couldn't find Mary's post to check comments.")
 
     # TC14
     print_step("TC14: Nestor creates Health post (1 minute expiry)")
     nestor_health = create_post(
+        sessions["Nestor"],
         base,
-        tokens["Nestor"],
         "Nestor Health Post",
         ["Health"],
         "Nestor: Health topic message.",
@@ -313,32 +908,33 @@ def main():
 
     # TC15
     print_step("TC15: Mary browses Health posts (should see Nestor's post)")
-    health_posts = browse_topic(base, tokens["Mary"], "Health")
+    health_posts = browse_topic(sessions["Mary"], base, "Health")
     print("  (Just a note) Expecting at least 1 Health post.")
 
     # TC16
     print_step("TC16: Mary comments on Nestor's Health post")
-    comment(base, tokens["Mary"], nestor_health, "Mary: commenting on Health post", who="Mary")
+    comment(sessions["Mary"], base, nestor_health, "Mary: commenting on Health post", who="Mary")
 
     # TC17
     print_step("TC17: After expiry, Mary dislikes Nestor's Health post (should fail)")
-    print("Waiting ~75 seconds for expiry...")
-    time.sleep(75)
-    r = dislike(base, tokens["Mary"], nestor_health, who="Mary (after expiry)")
+    if not advance_clock(sessions["Mary"], base, 75):
+        print("Waiting ~75 seconds for expiry...")
+        time.sleep(75)
+    r = dislike(sessions["Mary"], base, nestor_health, who="Mary (after expiry)")
     show_expected_actual("Dislike after expiry", "403 Forbidden", f"{r.status_code}")
 
     # TC18
     print_step("TC18: Nestor browses Health posts (should see 1 comment)")
-    health_posts = browse_topic(base, tokens["Nestor"], "Health")
+    health_posts = browse_topic(sessions["Nestor"], base, "Health")
     p_health = find_post(health_posts, nestor_health)
     if p_health:
-        show_expected_actual("Health post comments", "1", str(len(p_health.get("comments", []))))
+        show_expected_actual("Health post comments", "1", str(p_health.get("commentsCount")))
     else:
         print("  Couldn't find Nestor's Health post.")
 
     # TC19
     print_step("TC19: Nick checks expired posts in Sport (should be empty)")
-    expired_sport = expired_by_topic(base, tokens["Nick"], "Sport")
+    expired_sport = expired_by_topic(sessions["Nick"], base, "Sport")
     if isinstance(expired_sport, list):
         show_expected_actual("Expired Sport list length", "0", str(len(expired_sport)))
     else:
@@ -346,12 +942,16 @@ def main():
 
     # TC20
     print_step("TC20: Nestor queries most active Tech post (should be Mary's)")
-    active = most_active(base, tokens["Nestor"], "Tech")
+    active = most_active(sessions["Nestor"], base, "Tech")
     if active:
         show_expected_actual("Most active Tech post ID", mary_post, str(active.get("_id")))
     else:
         print("  Didn't get a response for most active Tech post.")
 
+    for session in sessions.values():
+        session.close()
+
+    BENCH.report("sequential")
     print("\nDone.")
 
 